@@ -0,0 +1,146 @@
+import contextvars
+import json
+import logging
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from pymongo import monitoring
+
+access_logger = logging.getLogger("access")
+slow_logger = logging.getLogger("access.slow")
+
+
+def configure_json_logging():
+    """Emit access and slow-query records as bare JSON lines on stdout."""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    access_logger.addHandler(handler)
+    access_logger.setLevel(logging.INFO)
+    access_logger.propagate = False
+
+
+class RequestStats:
+    __slots__ = ("request_id", "path", "mongo_calls", "mongo_micros", "lock")
+
+    def __init__(self, request_id: str, path: str):
+        self.request_id = request_id
+        self.path = path
+        self.mongo_calls = 0
+        self.mongo_micros = 0
+        self.lock = threading.Lock()
+
+
+# Stats of the request being handled. Motor copies the context into its
+# executor threads, so command events see the request that issued them.
+current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("current_request", default=None)
+
+# Where each command keeps its filter, for the slow-query log
+FILTER_FIELDS = {"find": "filter", "count": "query", "distinct": "query", "findAndModify": "query",
+                 "aggregate": "pipeline", "update": "updates", "delete": "deletes"}
+
+
+def query_shape(value):
+    """A filter with its values replaced by "?", keeping field names and operators."""
+    if isinstance(value, dict):
+        return {k: query_shape(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [query_shape(value[0])] if value else []
+    return "?"
+
+
+def command_shape(command_name: str, command: dict) -> dict:
+    shape = {"command": command_name, "collection": command.get(command_name)}
+    field = FILTER_FIELDS.get(command_name)
+    if field and field in command:
+        shape[field] = query_shape(command[field])
+    if "sort" in command:
+        shape["sort"] = command["sort"]
+    return shape
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Counts Mongo commands and their server time per request, and logs slow ones."""
+
+    def __init__(self, slow_ms: float):
+        self.slow_micros = slow_ms * 1000
+        self.commands = {}
+
+    def started(self, event):
+        # Only the command document is kept; it's shaped only if the command turns out slow
+        self.commands[event.request_id] = event.command
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool):
+        command = self.commands.pop(event.request_id, None)
+        stats = current_request.get()
+        if stats is not None:
+            with stats.lock:
+                stats.mongo_calls += 1
+                stats.mongo_micros += event.duration_micros
+        if event.duration_micros >= self.slow_micros and command is not None:
+            slow_logger.warning(json.dumps({
+                "event": "slow_query",
+                "ts": datetime.utcnow().isoformat(),
+                "request_id": stats.request_id if stats else None,
+                "path": stats.path if stats else None,
+                "duration_ms": round(event.duration_micros / 1000, 2),
+                "failed": failed,
+                **command_shape(event.command_name, command),
+            }, default=str))
+
+
+class AccessLogMiddleware:
+    """ASGI middleware giving each HTTP request an id and logging one JSON line for it.
+
+    The id is taken from an incoming X-Request-ID header or generated, and
+    echoed in the response. The line carries the route template, status,
+    latency and the number and server time of Mongo commands issued.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex[:16]
+        stats = RequestStats(request_id, scope["path"])
+        token = current_request.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            route = scope.get("route")
+            access_logger.info(json.dumps({
+                "event": "request",
+                "ts": datetime.utcnow().isoformat(),
+                "request_id": request_id,
+                "method": scope["method"],
+                "route": getattr(route, "path", scope["path"]),
+                "path": scope["path"],
+                "status": status,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                "mongo_calls": stats.mongo_calls,
+                "mongo_ms": round(stats.mongo_micros / 1000, 2),
+            }))
+            current_request.reset(token)
@@ -0,0 +1,115 @@
+import io
+import os
+import wave
+from collections import OrderedDict
+from typing import Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 22050
+CLICK_SECONDS = 0.03
+MAX_TRACK_SECONDS = 120
+
+# Click pitches (Hz) and levels
+ACCENT_HZ, BEAT_HZ, COUNT_IN_HZ = 1760.0, 1320.0, 880.0
+ACCENT_LEVEL, BEAT_LEVEL, COUNT_IN_LEVEL = 0.9, 0.6, 0.7
+
+# Rendered tracks by (bpm, time signature, bars, count-in bars), bounded by total bytes
+CACHE_MAX_BYTES = int(os.environ.get('CLICK_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+_cache: "OrderedDict[tuple, bytes]" = OrderedDict()
+_cache_bytes = 0
+cache_hits = 0
+cache_misses = 0
+
+
+def parse_time_signature(time_signature: str) -> Tuple[int, int]:
+    """Parse "4/4" into (beats per bar, beat unit). Raises ValueError if malformed."""
+    numerator, denominator = (int(x) for x in time_signature.split("/"))
+    if not 1 <= numerator <= 16 or denominator not in (2, 4, 8, 16):
+        raise ValueError(f"Unsupported time signature {time_signature}")
+    return numerator, denominator
+
+
+def _click(frequency: float, level: float, sample_rate: int) -> np.ndarray:
+    t = np.arange(int(CLICK_SECONDS * sample_rate)) / sample_rate
+    return level * np.sin(2 * np.pi * frequency * t) * np.exp(-t * 150)
+
+
+def render(bpm: int, time_signature: str = "4/4", bars: int = 4, count_in_bars: int = 0,
+           sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Render a click track as int16 samples.
+
+    Beats land on exact sample positions computed from the tempo, with an accent
+    on each downbeat and a lower-pitched click for count-in bars.
+    """
+    beats_per_bar, _ = parse_time_signature(time_signature)
+    total_beats = (bars + count_in_bars) * beats_per_bar
+    samples_per_beat = 60.0 * sample_rate / bpm
+    length = int(round(total_beats * samples_per_beat))
+    if length > MAX_TRACK_SECONDS * sample_rate:
+        raise ValueError(f"Click track longer than {MAX_TRACK_SECONDS} seconds")
+
+    templates = np.stack([
+        _click(BEAT_HZ, BEAT_LEVEL, sample_rate),
+        _click(ACCENT_HZ, ACCENT_LEVEL, sample_rate),
+        _click(COUNT_IN_HZ, COUNT_IN_LEVEL, sample_rate),
+    ])
+    beat_index = np.arange(total_beats)
+    kind = (beat_index % beats_per_bar == 0).astype(np.intp)
+    kind[:count_in_bars * beats_per_bar] = 2
+    onsets = np.round(beat_index * samples_per_beat).astype(np.intp)
+
+    buffer = np.zeros(length + templates.shape[1], dtype=np.float64)
+    positions = onsets[:, None] + np.arange(templates.shape[1])[None, :]
+    np.add.at(buffer, positions, templates[kind])
+    return (np.clip(buffer[:length], -1, 1) * 32767).astype("<i2")
+
+
+def to_wav(pcm: bytes, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Wrap 16-bit mono PCM in a WAV container."""
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return out.getvalue()
+
+
+def to_l16(pcm: bytes) -> bytes:
+    """Byte-swap little-endian PCM to the big-endian samples audio/L16 (RFC 2586) requires."""
+    return np.frombuffer(pcm, dtype="<i2").astype(">i2").tobytes()
+
+
+def l16_media_type(sample_rate: int = SAMPLE_RATE) -> str:
+    return f"audio/L16;rate={sample_rate};channels=1"
+
+
+def get_pcm(bpm: int, time_signature: str, bars: int, count_in_bars: int) -> bytes:
+    """Rendered 16-bit mono PCM, served from the cache when possible."""
+    global _cache_bytes, cache_hits, cache_misses
+    key = (bpm, time_signature, bars, count_in_bars)
+    pcm = _cache.get(key)
+    if pcm is not None:
+        _cache.move_to_end(key)
+        cache_hits += 1
+        return pcm
+
+    cache_misses += 1
+    pcm = render(bpm, time_signature, bars, count_in_bars).tobytes()
+    _cache[key] = pcm
+    _cache_bytes += len(pcm)
+    while _cache_bytes > CACHE_MAX_BYTES and len(_cache) > 1:
+        _, evicted = _cache.popitem(last=False)
+        _cache_bytes -= len(evicted)
+    return pcm
+
+
+def cache_stats() -> dict:
+    return {
+        "entries": len(_cache),
+        "bytes": _cache_bytes,
+        "max_bytes": CACHE_MAX_BYTES,
+        "hits": cache_hits,
+        "misses": cache_misses,
+    }
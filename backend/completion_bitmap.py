@@ -0,0 +1,115 @@
+import base64
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class CatalogOrdinals:
+    """Stable exercise id <-> ordinal mapping used to address bits in a completion bitmap.
+
+    Ordinals are persisted on the exercise documents and never reused, so a bit
+    keeps meaning the same exercise even when the catalog grows.
+    """
+
+    def __init__(self):
+        self.by_id: Dict[str, int] = {}
+        self.ids: List[Optional[str]] = []
+        # Bits of live ordinals; retired ordinals stay unset
+        self.mask = 0
+
+    def load(self, pairs: Iterable[Tuple[str, int]]):
+        """Replace the mapping with (exercise_id, ordinal) pairs read from the database."""
+        self.by_id = {}
+        self.ids = []
+        self.mask = 0
+        for exercise_id, ordinal in pairs:
+            self._set(exercise_id, ordinal)
+
+    def assign(self, exercise_ids: Iterable[str]) -> Dict[str, int]:
+        """Give the next free ordinals to ids that don't have one yet. Returns the new assignments."""
+        assigned = {}
+        for exercise_id in exercise_ids:
+            if exercise_id not in self.by_id:
+                ordinal = len(self.ids)
+                self._set(exercise_id, ordinal)
+                assigned[exercise_id] = ordinal
+        return assigned
+
+    def _set(self, exercise_id: str, ordinal: int):
+        if ordinal >= len(self.ids):
+            self.ids.extend([None] * (ordinal + 1 - len(self.ids)))
+        self.ids[ordinal] = exercise_id
+        self.by_id[exercise_id] = ordinal
+        self.mask |= 1 << ordinal
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __contains__(self, exercise_id):
+        return exercise_id in self.by_id
+
+
+def encode(exercise_ids: Iterable[str], ordinals: CatalogOrdinals) -> Tuple[int, List[str]]:
+    """Build a bitmap from exercise ids. Ids outside the catalog are returned separately."""
+    bitmap = 0
+    unknown = []
+    for exercise_id in exercise_ids:
+        ordinal = ordinals.by_id.get(exercise_id)
+        if ordinal is None:
+            unknown.append(exercise_id)
+        else:
+            bitmap |= 1 << ordinal
+    return bitmap, unknown
+
+
+def decode(bitmap: int, ordinals: CatalogOrdinals) -> List[str]:
+    """List the exercise ids whose bits are set, in ordinal order."""
+    ids = []
+    ordinal = 0
+    while bitmap:
+        if bitmap & 1 and ordinal < len(ordinals.ids) and ordinals.ids[ordinal]:
+            ids.append(ordinals.ids[ordinal])
+        bitmap >>= 1
+        ordinal += 1
+    return ids
+
+
+def is_completed(bitmap: int, exercise_id: str, ordinals: CatalogOrdinals) -> bool:
+    ordinal = ordinals.by_id.get(exercise_id)
+    return ordinal is not None and bool(bitmap >> ordinal & 1)
+
+
+def count(bitmap: int, ordinals: CatalogOrdinals) -> int:
+    """Number of completed exercises still in the catalog; bits of retired ordinals are ignored."""
+    return bin(bitmap & ordinals.mask).count("1")
+
+
+def percentage(bitmap: int, ordinals: CatalogOrdinals) -> float:
+    """Share of the catalog completed, as a percentage."""
+    if not len(ordinals):
+        return 0.0
+    return round(count(bitmap, ordinals) * 100 / len(ordinals), 1)
+
+
+def to_bytes(bitmap: int) -> bytes:
+    """Little-endian bytes for storage (bit n lives in byte n // 8)."""
+    return bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+
+
+def from_bytes(data: Optional[bytes]) -> int:
+    return int.from_bytes(data or b"", "little")
+
+
+def to_base64(bitmap: int) -> str:
+    return base64.b64encode(to_bytes(bitmap)).decode("ascii")
+
+
+def from_progress(progress: dict, ordinals: CatalogOrdinals) -> Tuple[int, List[str]]:
+    """Read the bitmap and off-catalog ids from a progress document.
+
+    Documents written before the bitmap existed only carry a `completed_exercises`
+    list; those are converted on the fly. Stored extras that have since been
+    given an ordinal are moved into the bitmap, so no id is reported twice.
+    """
+    bitmap = from_bytes(progress.get("completed_exercises_bitmap"))
+    ids = (progress.get("completed_exercises") or []) + (progress.get("completed_exercises_extra") or [])
+    known, unknown = encode(ids, ordinals)
+    return bitmap | known, list(dict.fromkeys(unknown))
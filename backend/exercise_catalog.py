@@ -0,0 +1,99 @@
+"""Read-only seed exercise catalog, loaded lazily from a precompiled data file.
+
+`seed_exercises.py` stays the place to author exercises. Building its ~70
+pydantic models on every import is wasted work for workers that never seed,
+so the catalog is compiled once into `data/exercise_catalog.json`
+(`python manage.py compile-catalog`) and loaded on first use into tuples.
+If the data file is missing or was compiled from a different
+`seed_exercises.py`, the catalog is built from the source instead.
+"""
+import copy
+import functools
+import hashlib
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SOURCE_PATH = Path(__file__).parent / "seed_exercises.py"
+CATALOG_PATH = Path(__file__).parent / "data" / "exercise_catalog.json"
+
+
+class CatalogExercise(NamedTuple):
+    id: str
+    title: str
+    domain: str
+    subdomain: Optional[str]
+    difficulty_tier: str
+    prerequisites: Tuple[str, ...]
+    duration_seconds: int
+    bpm_start: int
+    bpm_target: int
+    tags: Tuple[str, ...]
+    description_training: str
+    description_why: str
+    steps: Tuple[str, ...]
+    mistakes_and_fixes: Tuple[str, ...]
+    success_criteria: dict
+    level_up_variant: Optional[str]
+    tab_data: Optional[dict]
+
+
+FIELDS = CatalogExercise._fields
+
+
+def source_hash() -> str:
+    return hashlib.sha256(SOURCE_PATH.read_bytes()).hexdigest()[:16]
+
+
+def _entry(values) -> CatalogExercise:
+    return CatalogExercise(*(tuple(v) if isinstance(v, list) else v for v in values))
+
+
+def compile_rows() -> List[list]:
+    """Rows in FIELDS order, built from the pydantic seed definitions."""
+    from seed_exercises import ALL_EXERCISES
+
+    rows = []
+    for exercise in ALL_EXERCISES:
+        doc = json.loads(exercise.json(include=set(FIELDS)))
+        rows.append([doc[field] for field in FIELDS])
+    return rows
+
+
+def compile_catalog(path: Path = CATALOG_PATH) -> int:
+    """Write the data file; returns the number of exercises."""
+    rows = compile_rows()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"source_hash": source_hash(), "fields": FIELDS, "rows": rows}, f, separators=(",", ":"))
+    return len(rows)
+
+
+@functools.lru_cache(maxsize=1)
+def load() -> Tuple[CatalogExercise, ...]:
+    try:
+        with open(CATALOG_PATH) as f:
+            data = json.load(f)
+        if data["source_hash"] == source_hash() and tuple(data["fields"]) == FIELDS:
+            return tuple(_entry(row) for row in data["rows"])
+        logger.warning("Exercise catalog data file is stale; run `python manage.py compile-catalog`")
+    except FileNotFoundError:
+        logger.warning("Exercise catalog data file missing; run `python manage.py compile-catalog`")
+    return tuple(_entry(row) for row in compile_rows())
+
+
+def to_dict(exercise: CatalogExercise) -> dict:
+    """A fresh, mutable document shaped like `Exercise.dict()`."""
+    doc = {field: list(value) if isinstance(value, tuple) else copy.deepcopy(value)
+           for field, value in zip(FIELDS, exercise)}
+    doc["ordinal"] = None
+    doc["created_at"] = datetime.utcnow()
+    return doc
+
+
+def as_dicts() -> List[dict]:
+    return [to_dict(exercise) for exercise in load()]
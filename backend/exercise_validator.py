@@ -0,0 +1,62 @@
+import re
+from typing import Any, Dict, List
+
+# Bump whenever the rules below change, so the next deploy re-validates the
+# stored catalog even if the seed data is unchanged
+VALIDATOR_VERSION = 2
+
+MIN_BPM = 20
+MAX_BPM = 300
+
+# Domains practiced note for note (scale shapes, licks, sequences) can't be
+# played without tablature; rhythm, chord and technique work can be
+# practiced from the steps alone
+TAB_REQUIRED_DOMAINS = {"Scales & Fretboard", "Lead / Punteos"}
+
+PLACEHOLDER_TITLES = [
+    re.compile(p, re.IGNORECASE)
+    for p in (r"ejercicio libre", r"free practice", r"placeholder", r"coming soon",
+              r"\btodo\b", r"test exercise", r"^exercise \d+$")
+]
+
+
+def _tab_issues(tab_data: Dict[str, Any]) -> List[str]:
+    notes = tab_data.get("notes") or []
+    if not notes:
+        return ["tab_data has no notes"]
+    issues = []
+    string_count = len(tab_data.get("strings") or range(6))
+    for i, note in enumerate(notes):
+        if not isinstance(note.get("string"), int) or not 0 <= note["string"] < string_count:
+            issues.append(f"tab note {i} has an invalid string")
+        fret = note.get("fret")
+        if fret not in ("x", "X") and not (isinstance(fret, int) and 0 <= fret <= 24):
+            issues.append(f"tab note {i} has an invalid fret")
+    return issues
+
+
+def validate_exercise(exercise: Dict[str, Any]) -> List[str]:
+    """List what keeps an exercise from being playable. An empty list means it is complete."""
+    issues = []
+    for field in ("id", "title", "domain", "difficulty_tier", "description_training"):
+        if not str(exercise.get(field) or "").strip():
+            issues.append(f"missing {field}")
+    for field in ("steps", "mistakes_and_fixes", "success_criteria"):
+        if not exercise.get(field):
+            issues.append(f"empty {field}")
+
+    bpm_start, bpm_target = exercise.get("bpm_start"), exercise.get("bpm_target")
+    if not isinstance(bpm_start, int) or not isinstance(bpm_target, int):
+        issues.append("missing bpm range")
+    elif not MIN_BPM <= bpm_start <= bpm_target <= MAX_BPM:
+        issues.append(f"bpm range {bpm_start}-{bpm_target} outside {MIN_BPM}-{MAX_BPM} or reversed")
+
+    if exercise.get("tab_data"):
+        issues.extend(_tab_issues(exercise["tab_data"]))
+    elif exercise.get("domain") in TAB_REQUIRED_DOMAINS:
+        issues.append("missing tab_data")
+
+    title = exercise.get("title") or ""
+    if any(p.search(title) for p in PLACEHOLDER_TITLES):
+        issues.append("title looks like a placeholder")
+    return issues
@@ -0,0 +1,204 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from pymongo import DESCENDING, ReturnDocument, UpdateOne
+
+# Boards: total practice minutes, and the best streak (in days) reached
+BOARDS = ("minutes", "streak")
+ALL_TIME = "all"
+
+# Ranks are counted from a Fenwick tree of scores per (board, period), stored
+# one node per document in `leaderboard_counts`. Scores at or above MAX_SCORE
+# share the top slot.
+MAX_SCORE = 1 << 20
+
+# Entries written per bulk_write when backfilling from progress
+BACKFILL_BATCH = 1000
+
+
+def week_period(when: datetime) -> str:
+    """ISO week key, e.g. "2026-W07"."""
+    year, week, _ = when.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def resolve_period(period: str, now: Optional[datetime] = None) -> str:
+    """Map "all" / "week" / an explicit week key to the stored period key."""
+    if period == "week":
+        return week_period(now or datetime.utcnow())
+    return period
+
+
+async def ensure_indexes(db):
+    await db.leaderboards.create_index([("board", 1), ("period", 1), ("user_id", 1)], unique=True)
+    await db.leaderboards.create_index([("board", 1), ("period", 1), ("score", DESCENDING)])
+    await db.leaderboard_counts.create_index([("board", 1), ("period", 1), ("node", 1)], unique=True)
+
+
+def _slot(score: int) -> int:
+    """1-based Fenwick index of a score."""
+    return min(max(score, 0), MAX_SCORE - 1) + 1
+
+
+def count_updates(score: int) -> Iterable[int]:
+    """Nodes whose count changes when a score is added (or removed)."""
+    node = _slot(score)
+    while node <= MAX_SCORE:
+        yield node
+        node += node & -node
+
+
+def prefix_nodes(slot: int) -> Iterable[int]:
+    """Nodes whose counts sum to the number of scores in slots 1..slot."""
+    while slot > 0:
+        yield slot
+        slot -= slot & -slot
+
+
+async def _write_counts(db, deltas: Dict[Tuple[str, str], Dict[int, int]]):
+    ops = [
+        UpdateOne({"board": board, "period": period, "node": node}, {"$inc": {"count": delta}}, upsert=True)
+        for (board, period), nodes in deltas.items()
+        for node, delta in nodes.items()
+        if delta
+    ]
+    if ops:
+        await db.leaderboard_counts.bulk_write(ops, ordered=False)
+
+
+def _move(deltas: Dict[int, int], old: Optional[int], new: Optional[int]):
+    if old == new:
+        return
+    if old is not None:
+        for node in count_updates(old):
+            deltas[node] -= 1
+    if new is not None:
+        for node in count_updates(new):
+            deltas[node] += 1
+
+
+async def _update_score(db, board: str, period: str, user_id: str, operator: str, value: int) -> Tuple[Optional[int], int]:
+    """Apply `$inc` or `$max` to one entry; returns its score before and after."""
+    before = await db.leaderboards.find_one_and_update(
+        {"board": board, "period": period, "user_id": user_id},
+        {operator: {"score": value}},
+        projection={"_id": 0, "score": 1},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE
+    )
+    old = before["score"] if before else None
+    if operator == "$inc":
+        return old, (old or 0) + value
+    return old, value if old is None else max(old, value)
+
+
+async def record_workout(db, user_id: str, minutes: int, total_minutes: int, streak_days: int, when: datetime):
+    """Update all boards for one completed workout.
+
+    Minutes accumulate per week; the all-time board follows the user's
+    `total_practice_minutes`, so it also covers practice logged before the
+    boards existed. Streak boards keep the best streak reached,
+    all-time and during the week, so a lapsed streak doesn't linger on the
+    board as if it were current. Score counts for ranking follow in one bulk
+    write; they are not updated atomically with the entries, so a rank read
+    concurrently may be off by one for a moment.
+    """
+    week = week_period(when)
+    updates = [
+        ("minutes", ALL_TIME, "$max", total_minutes),
+        ("minutes", week, "$inc", minutes),
+        ("streak", ALL_TIME, "$max", streak_days),
+        ("streak", week, "$max", streak_days),
+    ]
+    results = await asyncio.gather(*(
+        _update_score(db, board, period, user_id, operator, value) for board, period, operator, value in updates
+    ))
+    deltas = defaultdict(lambda: defaultdict(int))
+    for (board, period, _, _), (old, new) in zip(updates, results):
+        _move(deltas[board, period], old, new)
+    await _write_counts(db, deltas)
+
+
+async def remove_user(db, user_id: str, period: str = ALL_TIME):
+    entries = await db.leaderboards.find({"period": period, "user_id": user_id}, {"_id": 0}).to_list(None)
+    await db.leaderboards.delete_many({"period": period, "user_id": user_id})
+    deltas = defaultdict(lambda: defaultdict(int))
+    for entry in entries:
+        _move(deltas[entry["board"], period], entry["score"], None)
+    await _write_counts(db, deltas)
+
+
+async def top(db, board: str, period: str, limit: int) -> list:
+    """Highest scores first, read from the (board, period, score) index."""
+    entries = await db.leaderboards.find(
+        {"board": board, "period": period},
+        {"_id": 0, "user_id": 1, "score": 1}
+    ).sort("score", DESCENDING).limit(limit).to_list(limit)
+    # Competition ranking: ties share a rank
+    rank = 0
+    previous = None
+    for position, entry in enumerate(entries, start=1):
+        if entry["score"] != previous:
+            rank = position
+            previous = entry["score"]
+        entry["rank"] = rank
+    return entries
+
+
+async def rank_of(db, board: str, period: str, user_id: str) -> Optional[dict]:
+    """A user's score and competition rank, from O(log MAX_SCORE) Fenwick nodes read in one query."""
+    entry = await db.leaderboards.find_one({"board": board, "period": period, "user_id": user_id})
+    if not entry:
+        return None
+    at_or_below = set(prefix_nodes(_slot(entry["score"])))
+    total = set(prefix_nodes(MAX_SCORE))
+    counts = {
+        doc["node"]: doc["count"]
+        for doc in await db.leaderboard_counts.find(
+            {"board": board, "period": period, "node": {"$in": sorted(at_or_below | total)}},
+            {"_id": 0, "node": 1, "count": 1}
+        ).to_list(None)
+    }
+    higher = sum(counts.get(node, 0) for node in total) - sum(counts.get(node, 0) for node in at_or_below)
+    return {"user_id": user_id, "score": entry["score"], "rank": higher + 1}
+
+
+async def rebuild_counts(db):
+    """Recompute every board's score counts from the leaderboard entries (`manage.py rebuild-leaderboards`).
+
+    Workouts recorded while this runs may be counted twice; run it when the
+    boards are quiet.
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    async for entry in db.leaderboards.find({}, {"_id": 0, "board": 1, "period": 1, "score": 1}):
+        _move(deltas[entry["board"], entry["period"]], None, entry["score"])
+    await db.leaderboard_counts.delete_many({})
+    await _write_counts(db, deltas)
+
+
+async def backfill(db) -> bool:
+    """Build all-time entries from existing progress, then every board's score counts (`manage.py seed`).
+
+    Runs once; the `meta` marker is only set after both steps finished, and
+    both are safe to repeat, so an interrupted run is simply redone. Returns
+    whether it ran.
+    """
+    if await db.meta.find_one({"_id": "leaderboard_backfill"}):
+        return False
+    ops = []
+    async for progress in db.progress.find(
+        {"total_practice_minutes": {"$gt": 0}}, {"_id": 0, "user_id": 1, "total_practice_minutes": 1, "streak_days": 1}
+    ):
+        for board, field in (("minutes", "total_practice_minutes"), ("streak", "streak_days")):
+            ops.append(UpdateOne(
+                {"board": board, "period": ALL_TIME, "user_id": progress["user_id"]},
+                {"$max": {"score": progress.get(field) or 0}},
+                upsert=True
+            ))
+    for i in range(0, len(ops), BACKFILL_BATCH):
+        await db.leaderboards.bulk_write(ops[i:i + BACKFILL_BATCH], ordered=False)
+    await rebuild_counts(db)
+    await db.meta.update_one({"_id": "leaderboard_backfill"}, {"$set": {"done_at": datetime.utcnow()}}, upsert=True)
+    return True
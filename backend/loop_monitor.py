@@ -0,0 +1,51 @@
+import asyncio
+import time
+from collections import deque
+
+
+class LoopLagMonitor:
+    """Measures event-loop lag: how late a periodic sleep wakes up.
+
+    Anything running synchronously on the loop (CPU-heavy handlers,
+    serialization) shows up as lag for every other request.
+    """
+
+    def __init__(self, interval: float = 0.25, window: int = 240):
+        self.interval = interval
+        self.samples: deque = deque(maxlen=window)
+        self.max_lag = 0.0
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - started - self.interval)
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    def stats(self) -> dict:
+        """Lag in milliseconds over the recent window (`max_ms` is since startup)."""
+        recent = sorted(self.samples)
+        if not recent:
+            return {"samples": 0, "last_ms": 0.0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        return {
+            "samples": len(recent),
+            "last_ms": round(self.samples[-1] * 1000, 2),
+            "p50_ms": round(recent[len(recent) // 2] * 1000, 2),
+            "p99_ms": round(recent[min(len(recent) - 1, int(len(recent) * 0.99))] * 1000, 2),
+            "max_ms": round(self.max_lag * 1000, 2),
+        }
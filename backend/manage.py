@@ -0,0 +1,113 @@
+"""Catalog management CLI.
+
+    python manage.py seed      # reconcile the catalog with the seed data, backfill leaderboards once
+    python manage.py diff      # compare seed data with the database by content hash
+    python manage.py verify    # consistency checks, non-zero exit on problems
+    python manage.py reset     # drop the catalog and seed it again
+    python manage.py compile-catalog  # rebuild data/exercise_catalog.json after editing seed_exercises.py
+    python manage.py rebuild-leaderboards  # recount leaderboard scores used for ranks
+
+Run with SEED_ON_STARTUP=false on the API servers to make seeding an explicit deploy step.
+"""
+import asyncio
+import os
+from pathlib import Path
+
+import typer
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from startup_lock import MongoLease
+import exercise_catalog
+import leaderboards
+import seeding
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+cli = typer.Typer(help="Guitar Gym catalog management.", no_args_is_help=True)
+
+
+def get_db():
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    return client[os.environ.get('DB_NAME', 'guitar_gym')]
+
+
+async def run_seed(db):
+    lease = MongoLease(db.locks, "seed", ttl_seconds=float(os.environ.get('SEED_LOCK_TTL_SECONDS', 60)))
+    if not await lease.acquire():
+        typer.echo("Another process is seeding; try again shortly.", err=True)
+        raise typer.Exit(code=1)
+    try:
+        await seeding.seed_database(db, lease)
+        if await leaderboards.backfill(db):
+            typer.echo("Leaderboards backfilled from progress.")
+    finally:
+        await lease.release()
+
+
+@cli.command()
+def seed():
+    """Add, update and remove exercises, phases and weeks to match the seed data."""
+    asyncio.run(run_seed(get_db()))
+    typer.echo("Seed complete.")
+
+
+@cli.command()
+def diff():
+    """Show which documents differ between the seed data and the database."""
+    result = asyncio.run(seeding.diff_catalog(get_db()))
+    print_changes(result)
+
+
+def print_changes(result):
+    for name, changes in result.items():
+        typer.echo(f"{name}: {len(changes['added'])} added, {len(changes['removed'])} removed, {len(changes['changed'])} changed")
+        for kind in ("added", "removed", "changed"):
+            for key in changes[kind]:
+                typer.echo(f"  {kind}: {key}")
+
+
+@cli.command()
+def verify():
+    """Check the stored catalog for consistency."""
+    problems = asyncio.run(seeding.verify_catalog(get_db()))
+    for problem in problems:
+        typer.echo(problem, err=True)
+    if problems:
+        raise typer.Exit(code=1)
+    typer.echo("Catalog OK.")
+
+
+@cli.command()
+def reset(yes: bool = typer.Option(False, "--yes", help="Don't ask for confirmation.")):
+    """Drop exercises, phases and weeks and seed them again. User data is kept."""
+    if not yes:
+        typer.confirm("Drop and reseed the catalog?", abort=True)
+
+    async def run():
+        db = get_db()
+        await seeding.reset_catalog(db)
+        await run_seed(db)
+
+    asyncio.run(run())
+    typer.echo("Catalog reset.")
+
+
+@cli.command("compile-catalog")
+def compile_catalog():
+    """Rebuild the precompiled exercise catalog from seed_exercises.py."""
+    count = exercise_catalog.compile_catalog()
+    typer.echo(f"Wrote {count} exercises to {exercise_catalog.CATALOG_PATH.relative_to(ROOT_DIR)}.")
+
+
+
+@cli.command("rebuild-leaderboards")
+def rebuild_leaderboards():
+    """Recompute the score counts leaderboard ranks are read from."""
+    asyncio.run(leaderboards.rebuild_counts(get_db()))
+    typer.echo("Leaderboard counts rebuilt.")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,75 @@
+import bisect
+import struct
+from typing import Any, Dict, Iterator, List, Tuple
+
+TICKS_PER_BEAT = 480
+
+# MIDI note of each open string, indexed like tab_data strings (0 = high E, 5 = low E)
+STANDARD_TUNING = [64, 59, 55, 50, 45, 40]
+
+GUITAR_PROGRAM = 27  # General MIDI "Electric Guitar (clean)", zero-based
+VELOCITY = 96
+MUTED_VELOCITY = 40
+MUTED_BEATS = 0.125
+
+# Events per yielded chunk when streaming the track
+CHUNK_EVENTS = 256
+
+
+def _vlq(value: int) -> bytes:
+    """MIDI variable-length quantity."""
+    out = [value & 0x7F]
+    value >>= 7
+    while value:
+        out.append(0x80 | (value & 0x7F))
+        value >>= 7
+    return bytes(reversed(out))
+
+
+def note_events(tab_data: Dict[str, Any]) -> List[Tuple[int, int, int, int]]:
+    """Turn tab notes into (tick, order, pitch, velocity) events; velocity 0 is note-off.
+
+    Notes without a beat are placed one per beat. A note rings until the next
+    onset on any string (one beat for the last); muted notes are short ghosts.
+    """
+    notes = tab_data.get("notes", [])
+    beats = [note.get("beat", i + 1) for i, note in enumerate(notes)]
+    onsets = sorted(set(beats))
+    events = []
+    for note, beat in zip(notes, beats):
+        string = note["string"]
+        if not 0 <= string < len(STANDARD_TUNING):
+            continue
+        muted = note.get("fret") in ("x", "X", None)
+        pitch = STANDARD_TUNING[string] + (0 if muted else int(note["fret"]))
+        following = bisect.bisect_right(onsets, beat)
+        length = MUTED_BEATS if muted else (onsets[following] - beat if following < len(onsets) else 1)
+        start = int(round((beat - 1) * TICKS_PER_BEAT))
+        end = start + max(1, int(round(length * TICKS_PER_BEAT)))
+        events.append((start, 1, pitch, MUTED_VELOCITY if muted else VELOCITY))
+        # Note-offs sort before note-ons at the same tick
+        events.append((end, 0, pitch, 0))
+    events.sort()
+    return events
+
+
+def iter_midi(tab_data: Dict[str, Any], bpm: int) -> Iterator[bytes]:
+    """Yield a format-0 Standard MIDI File for the tab in chunks."""
+    numerator, denominator = (int(x) for x in tab_data.get("time_signature", "4/4").split("/"))
+    microseconds_per_beat = int(60_000_000 / bpm)
+
+    track = [
+        b"\x00\xff\x51\x03" + microseconds_per_beat.to_bytes(3, "big"),
+        b"\x00\xff\x58\x04" + bytes([numerator, denominator.bit_length() - 1, 24, 8]),
+        b"\x00\xc0" + bytes([GUITAR_PROGRAM]),
+    ]
+    tick = 0
+    for event_tick, _, pitch, velocity in note_events(tab_data):
+        track.append(_vlq(event_tick - tick) + bytes([0x90, pitch, velocity]))
+        tick = event_tick
+    track.append(b"\x00\xff\x2f\x00")
+
+    yield b"MThd" + struct.pack(">IHHH", 6, 0, 1, TICKS_PER_BEAT)
+    yield b"MTrk" + struct.pack(">I", sum(len(event) for event in track))
+    for i in range(0, len(track), CHUNK_EVENTS):
+        yield b"".join(track[i:i + CHUNK_EVENTS])
@@ -42,6 +42,7 @@ class Exercise(BaseModel):
     success_criteria: Dict[str, Any] = {}  # accuracy %, timing %, noise threshold
     level_up_variant: Optional[str] = None
     tab_data: Optional[Dict[str, Any]] = None  # Tablature data for practice screen
+    ordinal: Optional[int] = None  # Stable position in the catalog, addresses completion bitmaps
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class ExerciseCreate(BaseModel):
@@ -62,6 +63,14 @@ class ExerciseCreate(BaseModel):
     level_up_variant: Optional[str] = None
     tab_data: Optional[Dict[str, Any]] = None
 
+class ExerciseBatchRequest(BaseModel):
+    ids: List[str]
+
+class TimingAttempt(BaseModel):
+    onsets: List[float] = Field(max_length=4000)  # Played note times in seconds
+    bpm: Optional[int] = Field(default=None, ge=20, le=400)  # Defaults to the exercise's bpm_start
+    subdivision: Optional[int] = Field(default=None, ge=1, le=8)  # Notes per beat; inferred from tags
+
 # Curriculum Models
 class RoutineBlock(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -80,6 +89,14 @@ class Day(BaseModel):
     is_rest_day: bool = False
     focus_summary: Optional[str] = None
 
+class DayVariant(BaseModel):
+    """A day resized for a non-default session length (see seed_curriculum.SESSION_DURATIONS)."""
+    id: str
+    week_number: int
+    day_number: int
+    duration_minutes: int
+    day: Day
+
 class Week(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     number: int  # 1-52
@@ -103,7 +120,8 @@ class UserProgress(BaseModel):
     user_id: str = "default_user"
     current_week: int = 1
     current_day: int = 1
-    completed_exercises: List[str] = []
+    completed_exercises_bitmap: bytes = b""  # bit n set = exercise with ordinal n completed
+    completed_exercises_extra: List[str] = []  # completed ids that aren't in the catalog
     completed_workouts: List[Dict[str, Any]] = []
     total_practice_minutes: int = 0
     streak_days: int = 0
@@ -119,6 +137,21 @@ class WorkoutCompletion(BaseModel):
     duration_minutes: int
     exercises_completed: List[str]
 
+# Practice telemetry
+MAX_SESSION_SECONDS = 24 * 60 * 60
+
+class TelemetryEvent(BaseModel):
+    t: float = Field(ge=0, le=MAX_SESSION_SECONDS)  # seconds since the session started
+    kind: str  # e.g. "timing_offset", "bpm_change", "mistake"
+    value: Optional[float] = None  # offset in ms, new bpm, ...
+    data: Optional[Dict[str, Any]] = None
+
+class TelemetryBatch(BaseModel):
+    session_id: str
+    exercise_id: Optional[str] = None
+    started_at: datetime
+    events: List[TelemetryEvent] = Field(max_length=1000)
+
 # Settings
 class UserSettings(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -0,0 +1,127 @@
+import io
+import wave
+from typing import List, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+MAX_RECORDING_SECONDS = 180
+MIN_SAMPLE_RATE, MAX_SAMPLE_RATE = 8000, 96000
+
+# Spectral flux tuning
+FRAME_SECONDS = 0.023  # ~1024 samples at 44.1 kHz
+HOPS_PER_FRAME = 4
+BACKGROUND_PERCENTILE = 20  # Per-bin magnitude taken as the recording's background noise
+LOG_COMPRESSION = 10.0
+PEAK_WINDOW_SECONDS = 0.03  # A peak must be the maximum within this distance
+MEAN_WINDOW_SECONDS = 0.1  # ... and exceed the local mean over this distance
+THRESHOLD = 0.15  # ... by this much, with flux normalised to 0-1
+MIN_GAP_SECONDS = 0.05  # Later peaks closer than this to an onset are dropped
+
+
+def parse_content_type(content_type: str) -> Tuple[str, dict]:
+    """Split a Content-Type header into the lower-cased media type and its parameters."""
+    media_type, *params = content_type.split(";")
+    parameters = {}
+    for param in params:
+        name, _, value = param.partition("=")
+        parameters[name.strip().lower()] = value.strip().strip('"')
+    return media_type.strip().lower(), parameters
+
+
+def decode_audio(data: bytes, content_type: str, sample_rate: int) -> Tuple[np.ndarray, int]:
+    """Decode an uploaded recording to mono floats in -1..1. Raises ValueError for anything unsupported.
+
+    Accepts a 16-bit WAV file, RFC 2586 audio/L16 (big-endian, with `rate` and
+    optional `channels` parameters), or raw little-endian mono PCM sent as
+    application/octet-stream at `sample_rate`. Multi-channel input is mixed down.
+    """
+    media_type, parameters = parse_content_type(content_type)
+    if media_type in ("audio/wav", "audio/x-wav", "audio/wave") or data[:4] == b"RIFF":
+        try:
+            with wave.open(io.BytesIO(data)) as wav:
+                if wav.getsampwidth() != 2:
+                    raise ValueError("Only 16-bit WAV is supported")
+                channels = wav.getnchannels()
+                sample_rate = wav.getframerate()
+                frames = wav.readframes(wav.getnframes())
+        except (wave.Error, EOFError) as e:
+            raise ValueError(f"Invalid WAV file: {e}")
+        samples = np.frombuffer(frames, dtype="<i2").reshape(-1, channels).mean(axis=1)
+    elif media_type == "audio/l16":
+        if "rate" not in parameters:
+            raise ValueError("audio/L16 requires a rate parameter")
+        try:
+            sample_rate = int(parameters["rate"])
+            channels = int(parameters.get("channels", 1))
+        except ValueError:
+            raise ValueError("Invalid audio/L16 parameters")
+        if not MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE or not 1 <= channels <= 8:
+            raise ValueError("Unsupported audio/L16 rate or channel count")
+        usable = len(data) - len(data) % (2 * channels)
+        samples = np.frombuffer(data[:usable], dtype=">i2").reshape(-1, channels).mean(axis=1)
+    elif media_type == "application/octet-stream":
+        samples = np.frombuffer(data[:len(data) - len(data) % 2], dtype="<i2").astype(np.float64)
+    else:
+        raise ValueError(f"Unsupported content type {media_type}")
+
+    if len(samples) > MAX_RECORDING_SECONDS * sample_rate:
+        raise ValueError(f"Recording longer than {MAX_RECORDING_SECONDS} seconds")
+    return samples / 32768.0, sample_rate
+
+
+def spectral_flux(samples: np.ndarray, sample_rate: int) -> Tuple[np.ndarray, int, int]:
+    """Half-wave rectified log-magnitude spectral flux per STFT frame, normalised to 0-1.
+
+    Returns (flux, frame length, hop) in samples. The recording is preceded
+    by a frame of background noise, so a note at the very start still shows up
+    as a rise in flux; frame i starts at sample i * hop - frame.
+    """
+    frame = 1 << int(round(np.log2(FRAME_SECONDS * sample_rate)))
+    hop = frame // HOPS_PER_FRAME
+    if len(samples) < frame:
+        return np.zeros(0), frame, hop
+    padded = np.concatenate([np.zeros(frame), samples])
+    frames = sliding_window_view(padded, frame)[::hop] * np.hanning(frame)
+    magnitude = np.log1p(LOG_COMPRESSION * np.abs(np.fft.rfft(frames, axis=1)))
+    # Lead-in frames overlapping the zero padding are raised to the background
+    # level, so a recording that starts with steady noise has no onset at 0
+    background = np.percentile(magnitude[HOPS_PER_FRAME:], BACKGROUND_PERCENTILE, axis=0)
+    magnitude[:HOPS_PER_FRAME] = np.maximum(magnitude[:HOPS_PER_FRAME], background)
+    flux = np.concatenate([[0.0], np.maximum(np.diff(magnitude, axis=0), 0).sum(axis=1)])
+    peak = flux.max()
+    return (flux / peak if peak > 0 else flux), frame, hop
+
+
+def pick_peaks(flux: np.ndarray, frames_per_second: float) -> np.ndarray:
+    """Frame indices of onsets: local maxima clearly above the local mean, at least MIN_GAP apart."""
+    if len(flux) == 0:
+        return np.zeros(0, dtype=np.intp)
+    peak_radius = max(1, int(round(PEAK_WINDOW_SECONDS * frames_per_second)))
+    mean_radius = max(1, int(round(MEAN_WINDOW_SECONDS * frames_per_second)))
+
+    neighbourhood = sliding_window_view(np.pad(flux, peak_radius, mode="edge"), 2 * peak_radius + 1)
+    is_max = flux >= neighbourhood.max(axis=1)
+    kernel = np.ones(2 * mean_radius + 1) / (2 * mean_radius + 1)
+    local_mean = np.convolve(np.pad(flux, mean_radius, mode="edge"), kernel, mode="valid")
+    candidates = np.flatnonzero(is_max & (flux > local_mean + THRESHOLD))
+
+    min_gap = MIN_GAP_SECONDS * frames_per_second
+    onsets = []
+    for index in candidates:
+        if not onsets or index - onsets[-1] >= min_gap:
+            onsets.append(index)
+    return np.asarray(onsets, dtype=np.intp)
+
+
+def detect_onsets(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """Onset times in seconds, taken at the centre of the frame where the flux peaks."""
+    flux, frame, hop = spectral_flux(samples, sample_rate)
+    peaks = pick_peaks(flux, sample_rate / hop)
+    return np.maximum(peaks * hop - frame / 2, 0) / sample_rate
+
+
+def analyze_recording(data: bytes, content_type: str, sample_rate: int) -> List[float]:
+    """Decode and detect onsets. Runs in a worker process, so it only takes and returns plain values."""
+    samples, sample_rate = decode_audio(data, content_type, sample_rate)
+    return [round(float(t), 4) for t in detect_onsets(samples, sample_rate)]
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from typing import List, Optional
+
+import timing_score
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = float(os.environ.get('PRACTICE_HEARTBEAT_SECONDS', 15))
+IDLE_TIMEOUT_SECONDS = float(os.environ.get('PRACTICE_IDLE_TIMEOUT_SECONDS', 60))
+SEND_BUFFER = int(os.environ.get('PRACTICE_SEND_BUFFER', 32))
+
+# Close codes
+SLOW_CONSUMER = 1013  # "Try again later": the client stopped reading
+IDLE = 1001
+
+# Live session counters, reported on /metrics
+stats = {"active": 0, "opened": 0, "completed": 0, "slow_consumers": 0, "idle_timeouts": 0}
+
+
+def tempo_ladder(bpm_start: int, bpm_target: int, step: int = 5) -> List[int]:
+    """Tempos from bpm_start up to bpm_target in `step` increments, always ending on the target."""
+    if bpm_target <= bpm_start:
+        return [bpm_start]
+    return list(range(bpm_start, bpm_target, step)) + [bpm_target]
+
+
+class PracticeSession:
+    """Server-side state of one live session: where the user is on the tempo ladder.
+
+    The server decides tempo changes: `passes_per_step` passing attempts in a
+    row at the current tempo move the user one rung up the ladder.
+    """
+
+    def __init__(self, exercise: dict, step: int = 5, passes_per_step: int = 2):
+        self.exercise_id = exercise["id"]
+        self.ladder = tempo_ladder(exercise.get("bpm_start", 60), exercise.get("bpm_target", 120), step)
+        self.subdivision = timing_score.subdivision_for(exercise)
+        self.success_criteria = exercise.get("success_criteria", {})
+        self.passes_per_step = passes_per_step
+        self.rung = 0
+        self.passes_in_a_row = 0
+        self.attempts = 0
+        self.passed = 0
+        self.reached_target = False
+        self.started = time.monotonic()
+
+    @property
+    def bpm(self) -> int:
+        return self.ladder[self.rung]
+
+    def state(self) -> dict:
+        return {"type": "state", "bpm": self.bpm, "rung": self.rung, "ladder": self.ladder}
+
+    def score(self, onsets: List[float]) -> dict:
+        """Score one attempt at the current tempo and advance the ladder if earned."""
+        bpm = self.bpm
+        metrics = timing_score.score_attempt(onsets, bpm, self.subdivision)
+        result = timing_score.evaluate(metrics, self.success_criteria)
+        self.attempts += 1
+        advanced = False
+        if result["passed"]:
+            self.passed += 1
+            self.passes_in_a_row += 1
+            if self.rung == len(self.ladder) - 1:
+                self.reached_target = True
+            elif self.passes_in_a_row >= self.passes_per_step:
+                self.rung += 1
+                self.passes_in_a_row = 0
+                advanced = True
+        else:
+            self.passes_in_a_row = 0
+        return {"type": "feedback", "bpm": bpm, "metrics": metrics, **result, "advanced": advanced, "next_bpm": self.bpm}
+
+    def duration_minutes(self) -> int:
+        return max(1, math.ceil((time.monotonic() - self.started) / 60))
+
+    def summary(self) -> dict:
+        return {
+            "exercise_id": self.exercise_id,
+            "attempts": self.attempts,
+            "passed": self.passed,
+            "top_bpm": self.bpm,
+            "reached_target": self.reached_target,
+        }
+
+
+class Channel:
+    """Outgoing side of a WebSocket with a bounded buffer and heartbeats.
+
+    Messages are queued and written by a single sender task, so handlers
+    never wait on a slow client. A client more than `max_buffer` messages
+    behind is disconnected instead of growing the buffer.
+    """
+
+    def __init__(self, websocket, max_buffer: int = SEND_BUFFER, heartbeat_seconds: float = HEARTBEAT_SECONDS):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffer)
+        self.heartbeat_seconds = heartbeat_seconds
+        self.closed = False
+        self._closing = False
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._send_loop()), asyncio.create_task(self._heartbeat_loop())]
+
+    def send(self, message: dict) -> bool:
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            stats["slow_consumers"] += 1
+            logger.warning("Closing practice session: client is not reading")
+            self.closed = True
+            asyncio.create_task(self.close(SLOW_CONSUMER))
+            return False
+
+    async def _send_loop(self):
+        while True:
+            message = await self.queue.get()
+            try:
+                await self.websocket.send_text(json.dumps(message, default=str))
+            except Exception:
+                self.closed = True  # Client went away; the receive side will see the disconnect
+                return
+            finally:
+                self.queue.task_done()
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            self.send({"type": "heartbeat", "t": time.time()})
+
+    async def close(self, code: Optional[int] = None):
+        """Stop the background tasks, flushing what's queued, and optionally close the socket."""
+        if self._closing:
+            return
+        self._closing = True
+        self.closed = True
+        sender, heartbeat = self._tasks or (None, None)
+        if heartbeat:
+            heartbeat.cancel()
+        if sender:
+            if code != SLOW_CONSUMER:
+                try:
+                    await asyncio.wait_for(self.queue.join(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+            sender.cancel()
+        if code is not None:
+            try:
+                await self.websocket.close(code=code)
+            except RuntimeError:
+                pass  # Already closed by the client
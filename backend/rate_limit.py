@@ -0,0 +1,202 @@
+import ipaddress
+import json
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+from urllib.parse import parse_qs
+
+# Peers allowed to report the client address in X-Forwarded-For: loopback and
+# private networks, where the ingress and load balancers live
+DEFAULT_TRUSTED_PROXIES = "127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,fc00::/7"
+
+
+def parse_networks(spec: str) -> list:
+    """Parse a comma-separated list of addresses and CIDR ranges."""
+    return [ipaddress.ip_network(part.strip(), strict=False) for part in spec.split(",") if part.strip()]
+
+
+def _trusted(address: str, networks: list) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+def client_address(scope, trusted_proxies: list) -> str:
+    """The client's IP address, read from X-Forwarded-For only as far as it was appended by trusted proxies.
+
+    Starting from the peer, hops are walked right to left while the address
+    seen is a trusted proxy; the first untrusted address is the client.
+    Anything further left was supplied by the client and is ignored.
+    """
+    address = (scope.get("client") or ("unknown",))[0]
+    if not _trusted(address, trusted_proxies):
+        return address
+    forwarded = [
+        hop.strip()
+        for name, value in scope.get("headers") or []
+        if name == b"x-forwarded-for"
+        for hop in value.decode("latin-1").split(",")
+    ]
+    for hop in reversed(forwarded):
+        if not hop:
+            continue
+        address = hop
+        if not _trusted(address, trusted_proxies):
+            break
+    return address
+
+
+class RouteLimit:
+    """Token-bucket limit for requests matching a method and path pattern.
+
+    WebSocket handshakes match the method "WEBSOCKET". Rules with the same name
+    share each client's bucket. `expensive` routes also count against the
+    global concurrency limit; `when_param` restricts the rule to requests
+    carrying that query parameter.
+    """
+
+    def __init__(self, name: str, method: str, path: str, rate: float, burst: int,
+                 expensive: bool = False, when_param: Optional[str] = None):
+        self.name = name
+        self.method = method
+        self.path = re.compile(path)
+        self.rate = rate
+        self.burst = burst
+        self.expensive = expensive
+        self.when_param = when_param
+
+    def matches(self, method: str, path: str, params: dict) -> bool:
+        return (
+            self.method in (method, "*")
+            and self.path.fullmatch(path) is not None
+            and (self.when_param is None or bool(params.get(self.when_param)))
+        )
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+
+    def take(self, rate: float, burst: int, now: float) -> float:
+        """Take one token. Returns 0 on success, else seconds until a token is available."""
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate
+
+
+class RateLimiter:
+    """Per-client, per-route token buckets plus a global limit on concurrent expensive requests.
+
+    Buckets live in memory in an LRU bounded by `max_buckets`, so idle clients
+    are forgotten first.
+    """
+
+    def __init__(self, rules: List[RouteLimit], default: RouteLimit,
+                 max_expensive_in_flight: int = 16, max_buckets: int = 100000):
+        self.rules = rules
+        self.default = default
+        self.max_expensive_in_flight = max_expensive_in_flight
+        self.max_buckets = max_buckets
+        self.buckets: "OrderedDict[tuple, TokenBucket]" = OrderedDict()
+        self.expensive_in_flight = 0
+        self.allowed = 0
+        self.rejected = 0
+
+    def match(self, method: str, path: str, params: dict) -> RouteLimit:
+        for rule in self.rules:
+            if rule.matches(method, path, params):
+                return rule
+        return self.default
+
+    def check(self, client: str, rule: RouteLimit) -> float:
+        """Returns 0 if the request may proceed, else the suggested retry delay in seconds."""
+        now = time.monotonic()
+        key = (client, rule.name)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(rule.burst, now)
+            if len(self.buckets) > self.max_buckets:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+        return bucket.take(rule.rate, rule.burst, now)
+
+    def stats(self) -> dict:
+        return {
+            "buckets": len(self.buckets),
+            "expensive_in_flight": self.expensive_in_flight,
+            "max_expensive_in_flight": self.max_expensive_in_flight,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+        }
+
+
+class RateLimitMiddleware:
+    """ASGI middleware answering 429 with Retry-After before the request reaches the app.
+
+    Clients are identified by IP address, taken from X-Forwarded-For when the
+    request came through one of `trusted_proxies` (addresses or CIDR ranges).
+    The client-chosen `user_id` parameter is deliberately not used: it would
+    let anyone rotate it to dodge limits or drain someone else's bucket.
+
+    WebSocket handshakes are limited too, and refused with a 429 where the
+    server supports denial responses, else closed with 1013 (try again later).
+    """
+
+    def __init__(self, app, limiter: RateLimiter, trusted_proxies: Iterable[str] = ()):
+        self.app = app
+        self.limiter = limiter
+        self.trusted_proxies = parse_networks(",".join(trusted_proxies))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+
+        params = {k: v[0] for k, v in parse_qs(scope.get("query_string", b"").decode("latin-1")).items()}
+        client = client_address(scope, self.trusted_proxies)
+        method = scope["method"] if scope["type"] == "http" else "WEBSOCKET"
+        rule = self.limiter.match(method, scope["path"], params)
+
+        retry_after = self.limiter.check(client, rule)
+        if not retry_after and rule.expensive and self.limiter.expensive_in_flight >= self.limiter.max_expensive_in_flight:
+            retry_after = 1.0
+        if retry_after:
+            self.limiter.rejected += 1
+            if scope["type"] == "http":
+                return await self.reject(send, retry_after)
+            if "websocket.http.response" in scope.get("extensions", {}):
+                return await self.reject(send, retry_after, response="websocket.http.response")
+            return await send({"type": "websocket.close", "code": 1013})
+
+        self.limiter.allowed += 1
+        if not rule.expensive:
+            return await self.app(scope, receive, send)
+        self.limiter.expensive_in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.expensive_in_flight -= 1
+
+    @staticmethod
+    async def reject(send, retry_after: float, response: str = "http.response"):
+        body = json.dumps({"detail": "Too many requests"}).encode()
+        await send({
+            "type": f"{response}.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(math.ceil(retry_after)).encode()),
+            ],
+        })
+        await send({"type": f"{response}.body", "body": body})
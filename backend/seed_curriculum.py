@@ -1,5 +1,5 @@
-from models import Phase, Week, Day, RoutineBlock, SkillDomain
-from seed_exercises import ALL_EXERCISES, get_exercises_by_domain, get_exercises_by_difficulty
+from models import Phase, Week, Day, DayVariant, RoutineBlock, SkillDomain
+import exercise_catalog
 from models import DifficultyTier
 import uuid
 
@@ -59,6 +59,24 @@ PHASES = [
     )
 ]
 
+# Session lengths users can choose (UserSettings.preferred_duration, minutes).
+# The weeks themselves hold the default-length days; other lengths are
+# stored as day variants.
+SESSION_DURATIONS = (15, 30, 45, 60)
+DEFAULT_DURATION = 30
+
+# Per session length: block type -> (seconds, max exercises)
+BLOCK_PLANS = {
+    15: {"warmup": (180, 1), "technique": (240, 1), "main": (360, 2), "application": (120, 1), "review": (900, 2)},
+    30: {"warmup": (300, 2), "technique": (480, 3), "main": (780, 3), "application": (240, 2), "review": (1800, 3)},
+    45: {"warmup": (300, 2), "technique": (900, 4), "main": (1200, 4), "application": (300, 2), "review": (2700, 4)},
+    60: {"warmup": (600, 3), "technique": (900, 4), "main": (1500, 5), "application": (600, 3), "review": (3600, 5)},
+}
+
+def nearest_duration(minutes: int) -> int:
+    """Snap a requested session length to the closest supported one."""
+    return min(SESSION_DURATIONS, key=lambda d: (abs(d - minutes), d))
+
 def get_phase_for_week(week_num: int) -> Phase:
     """Get the phase for a given week number."""
     for phase in PHASES:
@@ -84,81 +102,93 @@ def get_exercises_for_week(week_num: int, domains: list):
     
     # Get exercises matching domains and difficulty
     matching = []
-    for ex in ALL_EXERCISES:
+    for ex in exercise_catalog.load():
         if ex.domain in domains:
             if ex.difficulty_tier == primary_difficulty or ex.difficulty_tier == secondary_difficulty:
                 matching.append(ex)
     
     return matching[:10]  # Return up to 10 exercises
 
-def create_routine_block(block_type: str, duration: int, exercises: list, notes: str = None, explanation: str = None):
+def create_routine_block(block_type: str, duration: int, exercises: list, notes: str = None, explanation: str = None,
+                         max_exercises: int = 3):
     """Create a routine block."""
     return RoutineBlock(
         id=str(uuid.uuid4()),
         block_type=block_type,
         duration_seconds=duration,
-        exercise_ids=[ex.id for ex in exercises[:3]] if exercises else [],
+        exercise_ids=[ex.id for ex in exercises[:max_exercises]] if exercises else [],
         notes=notes,
         explanation=explanation
     )
 
-def create_day(day_num: int, week_num: int, focus_domains: list):
-    """Create a day with routine blocks."""
+def create_day(day_num: int, week_num: int, focus_domains: list, duration: int = DEFAULT_DURATION):
+    """Create a day with routine blocks, sized for a `duration`-minute session."""
     exercises = get_exercises_for_week(week_num, focus_domains)
+    plan = BLOCK_PLANS[duration]
     
     # Day 6 is review/jam day
     if day_num == 6:
+        seconds, count = plan["review"]
         return Day(
             id=str(uuid.uuid4()),
             day_number=day_num,
             routine_blocks=[
                 create_routine_block(
                     "review",
-                    1800,  # 30 min review
+                    seconds,
                     exercises[:5],
                     "Review week's material",
-                    "This week you learned new skills. This session reinforces them through free practice."
+                    "This week you learned new skills. This session reinforces them through free practice.",
+                    max_exercises=count
                 )
             ],
-            total_duration_seconds=1800,
+            total_duration_seconds=seconds,
             is_rest_day=False,
             focus_summary="Weekly Review & Jam Session"
         )
     
     # Regular training day
-    warmup_exercises = [ex for ex in exercises if 'warm-up' in ex.tags or 'fundamentals' in ex.tags][:2]
-    technique_exercises = [ex for ex in exercises if ex.domain in [SkillDomain.PICKING, SkillDomain.FRETTING, SkillDomain.TECHNIQUES]][:3]
-    main_exercises = [ex for ex in exercises if ex.domain in focus_domains][:3]
-    application_exercises = [ex for ex in exercises if ex.domain in [SkillDomain.MUSICAL_APPLICATION, SkillDomain.IMPROVISATION]][:2]
+    warmup_seconds, warmup_count = plan["warmup"]
+    technique_seconds, technique_count = plan["technique"]
+    main_seconds, main_count = plan["main"]
+    application_seconds, application_count = plan["application"]
+    warmup_exercises = [ex for ex in exercises if 'warm-up' in ex.tags or 'fundamentals' in ex.tags][:warmup_count]
+    technique_exercises = [ex for ex in exercises if ex.domain in [SkillDomain.PICKING, SkillDomain.FRETTING, SkillDomain.TECHNIQUES]][:technique_count]
+    main_exercises = [ex for ex in exercises if ex.domain in focus_domains][:main_count]
+    application_exercises = [ex for ex in exercises if ex.domain in [SkillDomain.MUSICAL_APPLICATION, SkillDomain.IMPROVISATION]][:application_count]
     
     blocks = [
         create_routine_block(
             "warmup",
-            300,  # 5 min
-            warmup_exercises or exercises[:2],
+            warmup_seconds,
+            warmup_exercises or exercises[:warmup_count],
             "Warm up your hands and focus your mind",
-            "Warming up prevents injury and prepares your muscles for precise movements."
+            "Warming up prevents injury and prepares your muscles for precise movements.",
+            max_exercises=warmup_count
         ),
         create_routine_block(
             "technique",
-            600,  # 10 min
-            technique_exercises or exercises[2:5],
+            technique_seconds,
+            technique_exercises or exercises[2:2 + technique_count],
             "Build fundamental technique",
-            "Technique practice builds the physical skills that make everything else possible."
+            "Technique practice builds the physical skills that make everything else possible.",
+            max_exercises=technique_count
         ),
         create_routine_block(
             "main",
-            900,  # 15 min
-            main_exercises or exercises[:3],
+            main_seconds,
+            main_exercises or exercises[:main_count],
             f"Focus: {', '.join([d.value for d in focus_domains[:2]])}",
-            f"Today's focus is on {focus_domains[0].value if focus_domains else 'general skills'}."
+            f"Today's focus is on {focus_domains[0].value if focus_domains else 'general skills'}.",
+            max_exercises=main_count
         ),
         create_routine_block(
             "application",
-            300,  # 5 min
-            application_exercises or exercises[-2:],
+            application_seconds,
+            application_exercises or exercises[-application_count:],
             "Apply what you learned musically",
-            "Application connects isolated skills to real music-making."
+            "Application connects isolated skills to real music-making.",
+            max_exercises=application_count
         )
     ]
     
@@ -173,13 +203,8 @@ def create_day(day_num: int, week_num: int, focus_domains: list):
         focus_summary=f"Focus: {', '.join([d.value for d in focus_domains[:2]])}"
     )
 
-def create_week(week_num: int):
-    """Create a complete week."""
-    phase = get_phase_for_week(week_num)
-    
-    # Define focus domains based on week number in a rotating pattern
-    all_domains = list(SkillDomain)
-    
+def get_focus_domains(week_num: int) -> list:
+    """Focus domains for a week, rotating through a phase-appropriate pattern."""
     # Phase-appropriate domain selection
     if week_num <= 8:  # Phase 1: Foundations
         focus_domains = [
@@ -223,6 +248,12 @@ def create_week(week_num: int):
             [SkillDomain.MUSICAL_APPLICATION, SkillDomain.IMPROVISATION],
             [SkillDomain.LEAD, SkillDomain.CHORDS]
         ][(week_num - 37) % 4]
+    return focus_domains
+
+def create_week(week_num: int):
+    """Create a complete week."""
+    phase = get_phase_for_week(week_num)
+    focus_domains = get_focus_domains(week_num)
     
     # Create days 1-6
     days = [create_day(d, week_num, focus_domains) for d in range(1, 7)]
@@ -254,6 +285,27 @@ def get_phases():
 def get_week(week_num: int):
     return create_week(week_num).dict()
 
+def get_day_variants(week_num: int):
+    """Days 1-6 of a week at every non-default session length, as day variant documents."""
+    focus_domains = get_focus_domains(week_num)
+    return [
+        DayVariant(
+            id=day_variant_id(week_num, day_num, duration),
+            week_number=week_num,
+            day_number=day_num,
+            duration_minutes=duration,
+            day=create_day(day_num, week_num, focus_domains, duration)
+        ).dict()
+        for duration in SESSION_DURATIONS if duration != DEFAULT_DURATION
+        for day_num in range(1, 7)
+    ]
+
+def get_day(week_num: int, day_num: int, duration: int = DEFAULT_DURATION):
+    return create_day(day_num, week_num, get_focus_domains(week_num), duration).dict()
+
+def day_variant_id(week_num: int, day_num: int, duration: int) -> str:
+    return f"week-{week_num}-day-{day_num}-{duration}min"
+
 def get_today_workout(week: int, day: int):
     """Get today's workout."""
     week_data = create_week(week)
@@ -0,0 +1,349 @@
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pymongo import DeleteOne, InsertOne, ReplaceOne, UpdateOne
+
+from completion_bitmap import CatalogOrdinals
+from exercise_validator import VALIDATOR_VERSION, validate_exercise
+import exercise_catalog
+import leaderboards
+import telemetry
+from seed_curriculum import SESSION_DURATIONS, get_day_variants, get_phases, get_week
+from startup_lock import MongoLease
+from sync import add_tombstones, backfill_sync_versions, ensure_sync_indexes, sync_write
+
+logger = logging.getLogger(__name__)
+
+# Fields that change on every generation or are assigned by the database,
+# ignored when comparing seed data with stored documents
+VOLATILE_FIELDS = {"_id", "created_at", "ordinal", "content_hash", "playable", "issues", "sync_version"}
+
+# (collection name, key field) for each seeded collection
+CATALOG_COLLECTIONS = (("exercises", "id"), ("phases", "id"), ("weeks", "number"), ("day_variants", "id"))
+
+# Bump whenever seed data changes (seed_exercises.py, then `manage.py
+# compile-catalog`; seed_curriculum.py). Startup only reconciles a catalog
+# seeded by an older version, so pods still running old code during a rolling
+# deploy never roll it back. `manage.py seed` reconciles unconditionally.
+SEED_VERSION = 1
+
+# Per-user collections, one document per user_id
+USER_COLLECTIONS = ("progress", "settings")
+
+# Secondary indexes backing the listing queries
+QUERY_INDEXES = {
+    "exercises": [
+        [("playable", 1), ("domain", 1), ("difficulty_tier", 1)],
+        # /export streams playable exercises in ordinal order without an in-memory sort
+        [("playable", 1), ("ordinal", 1)],
+        # load_catalog_ordinals and reserve_ordinals read every assigned ordinal
+        [("ordinal", 1)],
+    ],
+}
+
+
+def comparable(doc, top_level: bool = True):
+    """Strip volatile fields so seed data and stored documents can be compared.
+
+    Nested curriculum objects (days, routine blocks) get fresh uuids on every
+    generation, so their `id` is ignored too.
+    """
+    if isinstance(doc, dict):
+        return {
+            k: comparable(v, top_level=False)
+            for k, v in doc.items()
+            if k not in VOLATILE_FIELDS and (top_level or k != "id")
+        }
+    if isinstance(doc, list):
+        return [comparable(v, top_level=False) for v in doc]
+    return doc
+
+
+def content_hash(doc) -> str:
+    """Fingerprint of a document's content, ignoring volatile fields."""
+    payload = json.dumps(comparable(doc), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def seed_source() -> Dict[str, List[dict]]:
+    """All seed documents by collection name, each stamped with its content hash.
+
+    Generating and hashing the curriculum is CPU-bound; async callers should
+    run this in a thread.
+    """
+    source = {
+        "exercises": exercise_catalog.as_dicts(),
+        "phases": get_phases(),
+        "weeks": [get_week(week_num) for week_num in range(1, 53)],
+        "day_variants": [variant for week_num in range(1, 53) for variant in get_day_variants(week_num)],
+    }
+    for docs in source.values():
+        for doc in docs:
+            doc["content_hash"] = content_hash(doc)
+    return source
+
+
+def catalog_hashes(source: Dict[str, List[dict]]) -> Dict[str, str]:
+    """One fingerprint per seeded collection, over its keys and content hashes.
+
+    The exercises fingerprint also covers VALIDATOR_VERSION, since the
+    validation rules decide which exercises are playable.
+    """
+    hashes = {}
+    for name, key in CATALOG_COLLECTIONS:
+        prefix = f"validator:{VALIDATOR_VERSION};" if name == "exercises" else ""
+        fingerprint = prefix + "".join(f"{doc[key]}:{doc['content_hash']};" for doc in source[name])
+        hashes[name] = hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+    return hashes
+
+
+async def seed_current(db) -> bool:
+    """Whether the stored catalog was reconciled and validated by these versions or newer ones."""
+    stored = await get_catalog_version(db)
+    return stored.get("seed_version", 0) >= SEED_VERSION and stored.get("validator_version", 0) >= VALIDATOR_VERSION
+
+
+async def ensure_indexes(db):
+    """Create unique indexes so concurrent or repeated seeding (or first visits) can't
+    duplicate documents, plus the indexes used by listing queries."""
+    for name, key in CATALOG_COLLECTIONS + tuple((name, "user_id") for name in USER_COLLECTIONS):
+        try:
+            await db[name].create_index(key, unique=True)
+        except Exception as e:
+            logger.warning(f"Could not create unique index on {name}.{key}: {e}")
+    for name, indexes in QUERY_INDEXES.items():
+        for keys in indexes:
+            await db[name].create_index(keys)
+    await ensure_sync_indexes(db)
+    await leaderboards.ensure_indexes(db)
+    await telemetry.ensure_collection(db)
+
+
+async def seed_ready(db) -> bool:
+    marker = await db.meta.find_one({"_id": "seed"})
+    return bool(marker and marker.get("ready"))
+
+
+async def mark_seed_ready(db, ready: bool):
+    await db.meta.update_one(
+        {"_id": "seed"},
+        {"$set": {"ready": ready, "updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+
+async def load_catalog_ordinals(db, ordinals: CatalogOrdinals):
+    """Load the exercise id <-> ordinal mapping from the database."""
+    docs = await db.exercises.find({"ordinal": {"$ne": None}}, {"_id": 0, "id": 1, "ordinal": 1}).to_list(None)
+    ordinals.load((d["id"], d["ordinal"]) for d in docs)
+
+
+async def reserve_ordinals(db, ordinals: CatalogOrdinals):
+    """Load live and stashed ordinals so new exercises never take one that progress bitmaps may use."""
+    stash = await db.meta.find_one({"_id": "exercise_ordinals"}) or {}
+    live = await db.exercises.find({"ordinal": {"$ne": None}}, {"_id": 0, "id": 1, "ordinal": 1}).to_list(None)
+    ordinals.load(list(stash.get("by_id", {}).items()) + [(d["id"], d["ordinal"]) for d in live])
+
+
+async def stash_ordinals(db, by_id: Dict[str, int]):
+    """Remember ordinals of exercises leaving the database, to keep them reserved."""
+    if by_id:
+        await db.meta.update_one(
+            {"_id": "exercise_ordinals"},
+            {"$set": {**{f"by_id.{k}": v for k, v in by_id.items()}, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+
+async def get_catalog_version(db) -> dict:
+    version = await db.meta.find_one({"_id": "catalog_version"}, {"_id": 0})
+    return version or {"version": 0, "hashes": {}}
+
+
+async def reconcile_catalog(db, dry_run: bool = False) -> Dict[str, Dict[str, list]]:
+    """Bring the catalog in line with the seed data.
+
+    Documents are compared by content hash and only added, changed or removed
+    ones are written, with one unordered bulk_write per collection. The catalog
+    version is bumped whenever something changed. Returns added/removed/changed
+    keys per collection.
+    """
+    source = await asyncio.to_thread(seed_source)
+    ordinals = CatalogOrdinals()
+    await reserve_ordinals(db, ordinals)
+    summary = {}
+    retired = {}
+    # One sync version for the whole reconcile, held pending until every bulk write is done
+    async with (contextlib.nullcontext() if dry_run else sync_write(db)) as sync_version:
+        for name, key in CATALOG_COLLECTIONS:
+            stored = {
+                doc[key]: doc
+                for doc in await db[name].find({}, {"_id": 0, key: 1, "content_hash": 1, "created_at": 1}).to_list(None)
+            }
+            changes = {"added": [], "removed": [], "changed": []}
+            ops = []
+            for doc in source[name]:
+                k = doc[key]
+                doc["sync_version"] = sync_version
+                if name == "exercises":
+                    ordinals.assign([k])
+                    doc["ordinal"] = ordinals.by_id[k]
+                current = stored.get(k)
+                if current is None:
+                    ops.append(InsertOne(doc))
+                    changes["added"].append(k)
+                elif current.get("content_hash") != doc["content_hash"]:
+                    if current.get("created_at"):
+                        doc["created_at"] = current["created_at"]
+                    ops.append(ReplaceOne({key: k}, doc))
+                    changes["changed"].append(k)
+            wanted = {doc[key] for doc in source[name]}
+            for k in stored:
+                if k not in wanted:
+                    ops.append(DeleteOne({key: k}))
+                    changes["removed"].append(k)
+                    if name == "exercises" and k in ordinals:
+                        retired[k] = ordinals.by_id[k]
+            if ops and not dry_run:
+                await db[name].bulk_write(ops, ordered=False)
+                await add_tombstones(db, name, changes["removed"], sync_version)
+            summary[name] = changes
+
+    if not dry_run:
+        await stash_ordinals(db, retired)
+        # Hashes and seed version are recorded even when nothing had to be
+        # written, so startup sees the catalog as current
+        update = {"$set": {"hashes": catalog_hashes(source), "seed_version": SEED_VERSION, "updated_at": datetime.utcnow()}}
+        if any(changes[kind] for changes in summary.values() for kind in changes):
+            update["$inc"] = {"version": 1}
+        await db.meta.update_one({"_id": "catalog_version"}, update, upsert=True)
+    return summary
+
+
+async def seed_database(db, lease: Optional[MongoLease] = None):
+    """Reconcile exercises, phases, weeks and day variants with the seed data. Must run while holding the seed lease."""
+    await ensure_indexes(db)
+
+    for name, _ in CATALOG_COLLECTIONS:
+        if not await db[name].find_one({}, {"_id": 1}):
+            await mark_seed_ready(db, False)
+            break
+
+    summary = await reconcile_catalog(db)
+    for name, changes in summary.items():
+        counts = {kind: len(keys) for kind, keys in changes.items()}
+        if any(counts.values()):
+            logger.info(f"Reconciled {name}: {counts['added']} added, {counts['changed']} changed, {counts['removed']} removed")
+        else:
+            logger.info(f"{name} up to date")
+    if lease:
+        await lease.renew()
+
+    await backfill_sync_versions(db)
+    audit = await validate_catalog(db)
+    logger.info(f"{audit['playable']} of {audit['total']} exercises playable")
+
+    await mark_seed_ready(db, True)
+
+
+async def validate_catalog(db) -> Dict[str, int]:
+    """Validate every stored exercise in one pass and store its `playable` flag and `issues`.
+
+    Only exercises whose result changed are written, in a single bulk_write.
+    """
+    updates = {}
+    total = playable = 0
+    async for exercise in db.exercises.find({}, {"_id": 0, "created_at": 0}):
+        issues = validate_exercise(exercise)
+        total += 1
+        playable += not issues
+        if exercise.get("playable") != (not issues) or exercise.get("issues") != issues:
+            updates[exercise["id"]] = issues
+    if updates:
+        async with sync_write(db) as sync_version:
+            await db.exercises.bulk_write([
+                UpdateOne({"id": exercise_id}, {"$set": {"playable": not issues, "issues": issues, "sync_version": sync_version}})
+                for exercise_id, issues in updates.items()
+            ], ordered=False)
+    await db.meta.update_one({"_id": "catalog_version"}, {"$set": {"validator_version": VALIDATOR_VERSION}}, upsert=True)
+    return {"total": total, "playable": playable, "updated": len(updates)}
+
+
+async def diff_catalog(db) -> Dict[str, Dict[str, list]]:
+    """Compare seed data with the database by content hash, without writing anything."""
+    return await reconcile_catalog(db, dry_run=True)
+
+
+async def verify_catalog(db) -> List[str]:
+    """Check the stored catalog for consistency. Returns a list of problems (empty if healthy)."""
+    problems = []
+
+    exercises = await db.exercises.find({}, {"_id": 0, "id": 1, "ordinal": 1}).to_list(None)
+    exercise_ids = [ex["id"] for ex in exercises]
+    if not exercises:
+        problems.append("No exercises")
+    if len(set(exercise_ids)) != len(exercise_ids):
+        problems.append("Duplicate exercise ids")
+    ordinal_list = [ex.get("ordinal") for ex in exercises]
+    if None in ordinal_list:
+        problems.append(f"{ordinal_list.count(None)} exercises have no ordinal")
+    assigned = [o for o in ordinal_list if o is not None]
+    if len(set(assigned)) != len(assigned):
+        problems.append("Duplicate exercise ordinals")
+
+    phase_ids = {p["id"] for p in await db.phases.find({}, {"_id": 0, "id": 1}).to_list(None)}
+    if not phase_ids:
+        problems.append("No phases")
+
+    weeks = await db.weeks.find({}, {"_id": 0, "number": 1, "phase_id": 1, "days": 1}).to_list(None)
+    numbers = sorted(w["number"] for w in weeks)
+    if numbers != list(range(1, 53)):
+        problems.append(f"Expected weeks 1-52, found {len(numbers)} weeks")
+    known = set(exercise_ids)
+    for week in weeks:
+        if week["phase_id"] not in phase_ids:
+            problems.append(f"Week {week['number']} references unknown phase {week['phase_id']}")
+        missing = {
+            ex_id
+            for day in week.get("days", [])
+            for block in day.get("routine_blocks", [])
+            for ex_id in block.get("exercise_ids", [])
+            if ex_id not in known
+        }
+        if missing:
+            problems.append(f"Week {week['number']} references unknown exercises: {', '.join(sorted(missing))}")
+
+    expected_variants = 52 * 6 * (len(SESSION_DURATIONS) - 1)
+    variants = await db.day_variants.count_documents({})
+    if variants != expected_variants:
+        problems.append(f"Expected {expected_variants} day variants, found {variants}")
+
+    if not await seed_ready(db):
+        problems.append("Seed readiness marker is not set")
+    stored = await get_catalog_version(db)
+    if stored.get("seed_version", 0) < SEED_VERSION:
+        problems.append(f"Catalog was seeded by seed version {stored.get('seed_version', 0)}, expected {SEED_VERSION}")
+    elif stored.get("validator_version", 0) < VALIDATOR_VERSION:
+        problems.append(f"Catalog was validated by validator version {stored.get('validator_version', 0)}, expected {VALIDATOR_VERSION}")
+    elif stored["hashes"] != catalog_hashes(await asyncio.to_thread(seed_source)):
+        problems.append("Seed data changed without bumping SEED_VERSION; startup won't reconcile it")
+    return problems
+
+
+async def reset_catalog(db):
+    """Drop seeded collections and the readiness marker. User progress and settings are kept.
+
+    Exercise ordinals are stashed in `meta` first and reused by the next seed,
+    since progress bitmaps refer to them.
+    """
+    ordinals = CatalogOrdinals()
+    await load_catalog_ordinals(db, ordinals)
+    await stash_ordinals(db, ordinals.by_id)
+    for name, _ in CATALOG_COLLECTIONS:
+        await db[name].drop()
+    await db.meta.delete_one({"_id": "seed"})
@@ -1,22 +1,40 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Query
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
 import os
+import json
+import asyncio
+import time
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Optional, Dict, Any
 import uuid
-from datetime import datetime
+import copy
+from datetime import datetime, timedelta
 from enum import Enum
 
+from access_log import AccessLogMiddleware, MongoCommandListener, configure_json_logging
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Structured access logs: one JSON line per request with its Mongo call count
+# and time, plus a line for every Mongo command slower than SLOW_QUERY_MS
+ACCESS_LOG_ENABLED = os.environ.get('ACCESS_LOG_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(
+    mongo_url,
+    event_listeners=[MongoCommandListener(slow_ms=SLOW_QUERY_MS)] if ACCESS_LOG_ENABLED else []
+)
 db = client[os.environ.get('DB_NAME', 'guitar_gym')]
 
 # Create the main app
@@ -27,12 +45,36 @@ api_router = APIRouter(prefix="/api")
 
 # Import models and seed data
 from models import (
-    Exercise, ExerciseCreate, DifficultyTier, SkillDomain,
+    Exercise, ExerciseCreate, ExerciseBatchRequest, DifficultyTier, SkillDomain,
     Phase, Week, Day, RoutineBlock,
-    UserProgress, WorkoutCompletion, UserSettings
+    UserProgress, WorkoutCompletion, UserSettings, TelemetryBatch,
+    TimingAttempt
+)
+from seed_curriculum import (
+    get_phases, get_week, get_today_workout, PHASES, generate_full_curriculum,
+    DEFAULT_DURATION, nearest_duration, day_variant_id, get_day
+)
+from loop_monitor import LoopLagMonitor
+import completion_bitmap
+from completion_bitmap import CatalogOrdinals
+from response_cache import ResponseCache
+from startup_lock import MongoLease
+import tab_format
+import click_track
+import midi_export
+import timing_score
+import onset_detection
+import practice_session
+from practice_session import PracticeSession, Channel
+from worker_pool import BoundedPool, PoolBusy
+import leaderboards
+from telemetry import TelemetryBuffer
+from rate_limit import RateLimiter, RateLimitMiddleware, RouteLimit, DEFAULT_TRUSTED_PROXIES
+from sync import sync_write, sync_token, changes_since
+from seeding import (
+    seed_database, seed_ready, load_catalog_ordinals, get_catalog_version, content_hash,
+    ensure_indexes, seed_current
 )
-from seed_exercises import get_all_exercises, ALL_EXERCISES
-from seed_curriculum import get_phases, get_week, get_today_workout, PHASES, generate_full_curriculum
 
 # Configure logging
 logging.basicConfig(
@@ -41,41 +83,142 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Week/day responses shared by all users, keyed by (week, None) for a full week
+# or (week, day, session minutes) for a resolved day
+workout_cache = ResponseCache(
+    max_entries=int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 2048)),
+    ttl_seconds=float(os.environ.get('RESPONSE_CACHE_TTL_SECONDS', 300))
+)
+
+# Rendered MIDI previews keyed by (exercise content hash, bpm)
+midi_cache = ResponseCache(
+    max_entries=int(os.environ.get('MIDI_CACHE_MAX_ENTRIES', 256)),
+    ttl_seconds=float(os.environ.get('MIDI_CACHE_TTL_SECONDS', 3600))
+)
+
+# Per-user settings and progress documents keyed by user_id. Reads go through
+# the cache and writes update it; the TTL bounds staleness across workers.
+USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', 10000))
+USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', 60))
+settings_cache = ResponseCache(max_entries=USER_CACHE_MAX_ENTRIES, ttl_seconds=USER_CACHE_TTL_SECONDS)
+progress_cache = ResponseCache(max_entries=USER_CACHE_MAX_ENTRIES, ttl_seconds=USER_CACHE_TTL_SECONDS)
+
+# Practice telemetry is queued in memory and written in large batches
+telemetry_buffer = TelemetryBuffer(
+    db.telemetry,
+    max_queue=int(os.environ.get('TELEMETRY_MAX_QUEUE', 50000)),
+    batch_size=int(os.environ.get('TELEMETRY_BATCH_SIZE', 1000)),
+    flush_interval=float(os.environ.get('TELEMETRY_FLUSH_SECONDS', 1.0))
+)
+
+# Onset detection on uploaded recordings runs in worker processes; at most
+# ANALYSIS_MAX_PENDING recordings are analysed or waiting at once.
+analysis_pool = BoundedPool(
+    "analysis",
+    max_workers=int(os.environ.get('ANALYSIS_WORKERS', 2)),
+    max_pending=int(os.environ.get('ANALYSIS_MAX_PENDING', 8)),
+    processes=True
+)
+MAX_RECORDING_BYTES = int(os.environ.get('MAX_RECORDING_BYTES', 16 * 1024 * 1024))
+
+# Curriculum generation and large response serialization run on worker
+# threads so they don't stall the event loop; loop lag is reported on /metrics.
+cpu_pool = BoundedPool(
+    "cpu",
+    max_workers=int(os.environ.get('CPU_POOL_WORKERS', 2)),
+    max_pending=int(os.environ.get('CPU_POOL_MAX_PENDING', 32))
+)
+loop_monitor = LoopLagMonitor()
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def render_json(data) -> bytes:
+    return json.dumps(data, default=json_default, separators=(",", ":")).encode()
+
+async def offload(fn, *args):
+    """Run `fn` on the CPU pool, answering 503 when the pool is saturated."""
+    try:
+        return await cpu_pool.run(fn, *args)
+    except PoolBusy:
+        raise HTTPException(status_code=503, detail="Server busy, try again shortly", headers={"Retry-After": "1"})
+
+# Exercise id <-> ordinal mapping for completion bitmaps, loaded at startup
+catalog_ordinals = CatalogOrdinals()
+
+def serialize_progress(progress: dict, compact: bool = False) -> dict:
+    """Prepare a progress document for the API.
+
+    By default completed exercises are expanded to a list of ids; with `compact`
+    the raw bitmap is returned base64-encoded instead. The document passed in
+    is not modified, so cached documents can be serialized directly.
+    """
+    progress = dict(progress)
+    bitmap, extra = completion_bitmap.from_progress(progress, catalog_ordinals)
+    progress.pop("completed_exercises_bitmap", None)
+    if compact:
+        progress.pop("completed_exercises", None)
+        progress["completed_exercises_bitmap"] = completion_bitmap.to_base64(bitmap)
+        progress["completed_exercises_extra"] = extra
+    else:
+        progress.pop("completed_exercises_extra", None)
+        progress["completed_exercises"] = completion_bitmap.decode(bitmap, catalog_ordinals) + extra
+    progress["completed_exercises_count"] = completion_bitmap.count(bitmap, catalog_ordinals) + len(extra)
+    progress["completion_percentage"] = completion_bitmap.percentage(bitmap, catalog_ordinals)
+    if '_id' in progress:
+        progress['_id'] = str(progress['_id'])
+    return progress
+
+# Seeding coordination: with several workers/pods, one process holds the seed
+# lease and reconciles the catalog when it was seeded or validated by an older
+# SEED_VERSION or VALIDATOR_VERSION; the others wait for the readiness marker
+# and the current versions in `meta`, then create any missing indexes.
+# Set SEED_ON_STARTUP=false to skip all of this and seed with `python manage.py seed`.
+SEED_ON_STARTUP = os.environ.get('SEED_ON_STARTUP', 'true').lower() not in ('0', 'false', 'no')
+SEED_LOCK_TTL_SECONDS = float(os.environ.get('SEED_LOCK_TTL_SECONDS', 60))
+SEED_WAIT_TIMEOUT_SECONDS = float(os.environ.get('SEED_WAIT_TIMEOUT_SECONDS', 120))
+SEED_POLL_SECONDS = 0.5
+
+async def warm_caches():
+    """Load catalog ordinals and prefill the week cache in two queries."""
+    await load_catalog_ordinals(db, catalog_ordinals)
+    weeks = await db.weeks.find().to_list(52)
+    for week in weeks:
+        week['_id'] = str(week['_id'])
+        workout_cache.put((week["number"], None), week)
+    logger.info(f"Warmed caches with {len(catalog_ordinals)} exercise ordinals and {len(weeks)} weeks")
+
 # Startup event - seed database
 @app.on_event("startup")
 async def startup_event():
-    """Seed the database with exercises and curriculum on startup."""
+    """Seed the database (in exactly one process) and warm caches on startup."""
     logger.info("Starting Guitar Gym API...")
     
-    # Check if exercises exist
-    exercises_count = await db.exercises.count_documents({})
-    if exercises_count == 0:
-        logger.info("Seeding exercises...")
-        exercises_data = get_all_exercises()
-        if exercises_data:
-            await db.exercises.insert_many(exercises_data)
-            logger.info(f"Seeded {len(exercises_data)} exercises")
-    else:
-        logger.info(f"Found {exercises_count} existing exercises")
-    
-    # Check if phases exist
-    phases_count = await db.phases.count_documents({})
-    if phases_count == 0:
-        logger.info("Seeding phases...")
-        phases_data = get_phases()
-        if phases_data:
-            await db.phases.insert_many(phases_data)
-            logger.info(f"Seeded {len(phases_data)} phases")
-    
-    # Seed first 12 weeks with high detail
-    weeks_count = await db.weeks.count_documents({})
-    if weeks_count == 0:
-        logger.info("Seeding curriculum weeks...")
-        for week_num in range(1, 53):
-            week_data = get_week(week_num)
-            await db.weeks.insert_one(week_data)
-        logger.info("Seeded 52 weeks of curriculum")
+    lease = MongoLease(db.locks, "seed", ttl_seconds=SEED_LOCK_TTL_SECONDS)
+    deadline = time.monotonic() + SEED_WAIT_TIMEOUT_SECONDS
+    while SEED_ON_STARTUP:
+        if await seed_ready(db) and not await lease.is_held() and await seed_current(db):
+            # Index creation is idempotent; new indexes reach existing
+            # databases on the next deploy
+            await ensure_indexes(db)
+            break
+        if await lease.acquire():
+            logger.info(f"Acquired seed lease as {lease.owner}")
+            try:
+                await seed_database(db, lease)
+            finally:
+                await lease.release()
+            break
+        if time.monotonic() > deadline:
+            logger.warning("Timed out waiting for another process to finish seeding")
+            break
+        await asyncio.sleep(SEED_POLL_SECONDS)
     
+    await warm_caches()
+    telemetry_buffer.start()
+    loop_monitor.start()
     logger.info("Guitar Gym API startup complete!")
 
 # Root endpoint
@@ -100,11 +243,14 @@ async def get_exercises(
     difficulty: Optional[str] = None,
     search: Optional[str] = None,
     limit: int = Query(default=50, le=100),
-    skip: int = 0
+    skip: int = 0,
+    include_unplayable: bool = False
 ):
-    """Get all exercises with optional filters."""
+    """Get all exercises with optional filters. Incomplete exercises are left out unless asked for."""
     query = {}
     
+    if not include_unplayable:
+        query["playable"] = True
     if domain:
         query["domain"] = domain
     if difficulty:
@@ -132,8 +278,9 @@ async def get_exercises(
 
 @api_router.get("/exercises/domains")
 async def get_domains():
-    """Get all skill domains with exercise counts."""
+    """Get all skill domains with playable exercise counts."""
     pipeline = [
+        {"$match": {"playable": True}},
         {"$group": {"_id": "$domain", "count": {"$sum": 1}}},
         {"$sort": {"count": -1}}
     ]
@@ -144,8 +291,9 @@ async def get_domains():
 
 @api_router.get("/exercises/difficulties")
 async def get_difficulties():
-    """Get all difficulty tiers with exercise counts."""
+    """Get all difficulty tiers with playable exercise counts."""
     pipeline = [
+        {"$match": {"playable": True}},
         {"$group": {"_id": "$difficulty_tier", "count": {"$sum": 1}}},
         {"$sort": {"_id": 1}}
     ]
@@ -154,6 +302,49 @@ async def get_difficulties():
         "difficulties": [{"name": r["_id"], "count": r["count"]} for r in result]
     }
 
+MAX_BATCH_IDS = 300
+
+async def fetch_exercises_by_ids(exercise_ids: List[str]) -> Dict[str, dict]:
+    """Fetch exercises with a single $in query, keyed by id."""
+    exercises = await db.exercises.find({"id": {"$in": list(set(exercise_ids))}}).to_list(None)
+    for ex in exercises:
+        if '_id' in ex:
+            ex['_id'] = str(ex['_id'])
+    return {ex["id"]: ex for ex in exercises}
+
+async def get_exercise_batch(exercise_ids: List[str]):
+    if len(exercise_ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per batch")
+    found = await fetch_exercises_by_ids(exercise_ids)
+    return {
+        "exercises": [found[ex_id] for ex_id in exercise_ids if ex_id in found],
+        "missing": [ex_id for ex_id in exercise_ids if ex_id not in found]
+    }
+
+@api_router.get("/exercises/batch")
+async def get_exercises_batch(ids: str = Query(description="Comma-separated exercise ids")):
+    """Get several exercises in request order. Unknown ids are reported in `missing`."""
+    return await get_exercise_batch([ex_id for ex_id in ids.split(",") if ex_id])
+
+@api_router.post("/exercises/batch")
+async def post_exercises_batch(request: ExerciseBatchRequest):
+    """Same as GET /exercises/batch, for id lists too long for a query string."""
+    return await get_exercise_batch(request.ids)
+
+@api_router.get("/exercises/audit")
+async def get_exercise_audit():
+    """Content audit: exercises hidden from listings and why."""
+    total = await db.exercises.count_documents({})
+    unplayable = await db.exercises.find(
+        {"playable": {"$ne": True}},
+        {"_id": 0, "id": 1, "title": 1, "domain": 1, "issues": 1}
+    ).to_list(None)
+    return {
+        "total": total,
+        "playable": total - len(unplayable),
+        "unplayable": unplayable
+    }
+
 @api_router.get("/exercises/{exercise_id}")
 async def get_exercise(exercise_id: str):
     """Get a specific exercise by ID."""
@@ -164,6 +355,152 @@ async def get_exercise(exercise_id: str):
         exercise['_id'] = str(exercise['_id'])
     return exercise
 
+@api_router.get("/exercises/{exercise_id}/tab")
+async def get_exercise_tab(exercise_id: str, format: str = "columns"):
+    """Get an exercise's tablature as parallel arrays (`columns`) or packed bytes (`binary`)."""
+    if format not in ("columns", "binary"):
+        raise HTTPException(status_code=400, detail="Format must be 'columns' or 'binary'")
+    
+    exercise = await db.exercises.find_one({"id": exercise_id}, {"_id": 0, "tab_data": 1})
+    if not exercise:
+        raise HTTPException(status_code=404, detail="Exercise not found")
+    if not exercise.get("tab_data"):
+        raise HTTPException(status_code=404, detail="Exercise has no tab data")
+    
+    if format == "binary":
+        return Response(content=tab_format.pack(exercise["tab_data"]), media_type="application/octet-stream")
+    return tab_format.to_columns(exercise["tab_data"])
+
+async def get_scoring_exercise(exercise_id: str) -> dict:
+    exercise = await db.exercises.find_one(
+        {"id": exercise_id}, {"_id": 0, "bpm_start": 1, "tags": 1, "success_criteria": 1}
+    )
+    if not exercise:
+        raise HTTPException(status_code=404, detail="Exercise not found")
+    return exercise
+
+def score_onsets(exercise_id: str, exercise: dict, onsets: List[float],
+                 bpm: Optional[int], subdivision: Optional[int]) -> dict:
+    bpm = bpm or exercise.get("bpm_start", 60)
+    subdivision = subdivision or timing_score.subdivision_for(exercise)
+    metrics = timing_score.score_attempt(onsets, bpm, subdivision)
+    return {
+        "exercise_id": exercise_id,
+        "bpm": bpm,
+        "subdivision": subdivision,
+        "metrics": metrics,
+        **timing_score.evaluate(metrics, exercise.get("success_criteria", {}))
+    }
+
+@api_router.post("/exercises/{exercise_id}/score")
+async def score_exercise_attempt(exercise_id: str, attempt: TimingAttempt):
+    """Score played onset times against the exercise's tempo grid and success criteria."""
+    exercise = await get_scoring_exercise(exercise_id)
+    return score_onsets(exercise_id, exercise, attempt.onsets, attempt.bpm, attempt.subdivision)
+
+@api_router.post("/exercises/{exercise_id}/recording")
+async def score_exercise_recording(
+    exercise_id: str,
+    request: Request,
+    sample_rate: int = Query(default=click_track.SAMPLE_RATE, ge=8000, le=96000),
+    bpm: Optional[int] = Query(default=None, ge=20, le=400),
+    subdivision: Optional[int] = Query(default=None, ge=1, le=8)
+):
+    """Detect note onsets in an uploaded recording and score them like `/score`.
+
+    The body is a 16-bit WAV file (audio/wav), big-endian audio/L16 with a
+    `rate` parameter, or raw little-endian mono PCM (application/octet-stream)
+    at `sample_rate`. Responds 503 with Retry-After when the analysis workers
+    are saturated.
+    """
+    if int(request.headers.get("content-length") or 0) > MAX_RECORDING_BYTES:
+        raise HTTPException(status_code=413, detail="Recording too large")
+    exercise = await get_scoring_exercise(exercise_id)
+    # Chunked uploads carry no Content-Length, so the cap is enforced while reading
+    data = bytearray()
+    async for chunk in request.stream():
+        data += chunk
+        if len(data) > MAX_RECORDING_BYTES:
+            raise HTTPException(status_code=413, detail="Recording too large")
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty recording")
+    data = bytes(data)
+    
+    try:
+        onsets = await analysis_pool.run(
+            onset_detection.analyze_recording, data, request.headers.get("content-type", ""), sample_rate
+        )
+    except PoolBusy:
+        raise HTTPException(status_code=503, detail="Analysis busy, try again shortly", headers={"Retry-After": "2"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    result = score_onsets(exercise_id, exercise, onsets, bpm, subdivision)
+    result["onsets"] = onsets
+    return result
+
+@api_router.get("/catalog/version")
+async def get_catalog_version_info():
+    """Get the catalog version, bumped whenever seed data reconciliation changes something."""
+    return await get_catalog_version(db)
+
+EXPORT_BATCH_SIZE = 100
+
+def ndjson_line(kind: str, data: dict) -> bytes:
+    return (json.dumps({"type": kind, "data": data}, default=str, separators=(",", ":")) + "\n").encode()
+
+def ndjson_lines(kind: str, docs: List[dict]) -> bytes:
+    return b"".join(ndjson_line(kind, doc) for doc in docs)
+
+async def serialize_batch(kind: str, docs: List[dict]) -> bytes:
+    # The response has already started, so a busy pool can't turn into a 503:
+    # serialize inline instead.
+    try:
+        return await cpu_pool.run(ndjson_lines, kind, docs)
+    except PoolBusy:
+        return ndjson_lines(kind, docs)
+
+@api_router.get("/export")
+async def export_catalog(include_unplayable: bool = False):
+    """Stream the whole catalog and curriculum as NDJSON for offline clients.
+
+    The first line is a `meta` record with the catalog version (also sent as the
+    X-Catalog-Version header), followed by phases, weeks, day variants (the
+    15/45/60-minute sessions) and exercises read straight from Mongo cursors,
+    so memory use doesn't grow with the catalog.
+    """
+    version = await get_catalog_version(db)
+    token = await sync_token(db)
+    exercise_query = {} if include_unplayable else {"playable": True}
+    
+    async def stream():
+        yield ndjson_line("meta", {
+            "catalog_version": version.get("version", 0),
+            "hashes": version.get("hashes", {}),
+            "sync_token": token
+        })
+        sources = (
+            ("phase", db.phases.find({}, {"_id": 0}).sort("weeks_start", 1)),
+            ("week", db.weeks.find({}, {"_id": 0}).sort("number", 1)),
+            ("day_variant", db.day_variants.find({}, {"_id": 0}).sort("id", 1)),
+            ("exercise", db.exercises.find(exercise_query, {"_id": 0}).sort("ordinal", 1))
+        )
+        for kind, cursor in sources:
+            batch = []
+            async for doc in cursor.batch_size(EXPORT_BATCH_SIZE):
+                batch.append(doc)
+                if len(batch) == EXPORT_BATCH_SIZE:
+                    yield await serialize_batch(kind, batch)
+                    batch = []
+            if batch:
+                yield await serialize_batch(kind, batch)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        headers={"X-Catalog-Version": str(version.get("version", 0))}
+    )
+
 # ============== CURRICULUM ENDPOINTS ==============
 
 @api_router.get("/phases")
@@ -186,53 +523,70 @@ async def get_all_weeks(phase_id: Optional[str] = None):
     for w in weeks:
         if '_id' in w:
             w['_id'] = str(w['_id'])
-    return {"weeks": weeks}
+    # A full year of weeks is a large document; encode it off the loop
+    return Response(content=await offload(render_json, {"weeks": weeks}), media_type="application/json")
 
-@api_router.get("/weeks/{week_number}")
-async def get_week_detail(week_number: int):
-    """Get detailed week data."""
-    if week_number < 1 or week_number > 52:
-        raise HTTPException(status_code=400, detail="Week must be between 1 and 52")
-    
+async def load_week(week_number: int):
+    """Load a week from the database, generating it on the fly if missing."""
     week = await db.weeks.find_one({"number": week_number})
     if not week:
-        # Generate on the fly if not found
-        week = get_week(week_number)
+        # Generate on the fly if not found, off the event loop
+        week = await offload(get_week, week_number)
     else:
         if '_id' in week:
             week['_id'] = str(week['_id'])
-    
     return week
 
+@api_router.get("/weeks/{week_number}")
+async def get_week_detail(week_number: int):
+    """Get detailed week data."""
+    if week_number < 1 or week_number > 52:
+        raise HTTPException(status_code=400, detail="Week must be between 1 and 52")
+    
+    return await workout_cache.get_or_load((week_number, None), lambda: load_week(week_number))
+
 @api_router.get("/today")
-async def get_today(week: int = 1, day: int = 1):
-    """Get today's workout based on current week and day."""
+async def get_today(week: int = 1, day: int = 1, duration: Optional[int] = None, user_id: str = "default_user"):
+    """Get today's workout based on current week and day.
+
+    The session is sized for `duration` minutes, or the user's preferred
+    duration, snapped to the nearest supported length.
+    """
     if week < 1 or week > 52:
         week = 1
     if day < 1 or day > 6:
         day = 1
+    if duration is None:
+        duration = preferred_duration(await peek_settings(user_id))
+    duration = nearest_duration(duration)
     
-    # Get the day's workout
-    week_data = await db.weeks.find_one({"number": week})
-    if not week_data:
-        week_data = get_week(week)
+    return await workout_cache.get_or_load((week, day, duration), lambda: load_today(week, day, duration))
+
+async def load_day_variant(week: int, day: int, duration: int) -> dict:
+    """A precomputed resized day, generated off the event loop if it wasn't seeded."""
+    variant = await db.day_variants.find_one({"id": day_variant_id(week, day, duration)}, {"_id": 0, "day": 1})
+    if variant:
+        return variant["day"]
+    return await offload(get_day, week, day, duration)
+
+async def load_today(week: int, day: int, duration: int = DEFAULT_DURATION):
+    """Resolve a day's workout with phase info and exercise details."""
+    week_data = await workout_cache.get_or_load((week, None), lambda: load_week(week))
     
-    day_data = week_data["days"][day - 1] if day <= len(week_data["days"]) else week_data["days"][0]
+    if duration == DEFAULT_DURATION:
+        # Copy the day so resolved exercises don't leak into the cached week
+        day_data = copy.deepcopy(week_data["days"][day - 1] if day <= len(week_data["days"]) else week_data["days"][0])
+    else:
+        day_data = await load_day_variant(week, day, duration)
     
     # Get phase info
     phase = await db.phases.find_one({"id": week_data["phase_id"]})
     
-    # Fetch exercise details for each block
-    exercise_details = []
-    for block in day_data.get("routine_blocks", []):
-        block_exercises = []
-        for ex_id in block.get("exercise_ids", []):
-            ex = await db.exercises.find_one({"id": ex_id})
-            if ex:
-                if '_id' in ex:
-                    ex['_id'] = str(ex['_id'])
-                block_exercises.append(ex)
-        block["exercises"] = block_exercises
+    # Fetch exercise details for all blocks in one query
+    blocks = day_data.get("routine_blocks", [])
+    found = await fetch_exercises_by_ids([ex_id for block in blocks for ex_id in block.get("exercise_ids", [])])
+    for block in blocks:
+        block["exercises"] = [found[ex_id] for ex_id in block.get("exercise_ids", []) if ex_id in found]
     
     return {
         "week_number": week,
@@ -242,31 +596,138 @@ async def get_today(week: int = 1, day: int = 1):
             "name": phase["name"] if phase else "Foundations"
         },
         "week_title": week_data.get("title", f"Week {week}"),
+        "duration_minutes": duration,
         "day": day_data,
         "total_duration_minutes": day_data.get("total_duration_seconds", 1800) // 60
     }
 
-# ============== PROGRESS ENDPOINTS ==============
+# ============== AUDIO ENDPOINTS ==============
 
-@api_router.get("/progress")
-async def get_user_progress(user_id: str = "default_user"):
-    """Get user progress."""
-    progress = await db.progress.find_one({"user_id": user_id})
+@api_router.get("/click-track")
+async def get_click_track(
+    bpm: int = Query(ge=30, le=300),
+    time_signature: str = "4/4",
+    bars: int = Query(default=4, ge=1, le=64),
+    count_in: Optional[bool] = None,
+    format: str = "wav",
+    user_id: str = "default_user"
+):
+    """Render a metronome click track. Count-in follows the user's settings unless `count_in` is given."""
+    if format not in ("wav", "pcm"):
+        raise HTTPException(status_code=400, detail="Format must be 'wav' or 'pcm'")
+    try:
+        beats_per_bar, _ = click_track.parse_time_signature(time_signature)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid time signature")
     
-    if not progress:
-        # Create default progress
-        progress = UserProgress(user_id=user_id).dict()
-        await db.progress.insert_one(progress)
+    if count_in is None:
+        settings = await peek_settings(user_id)
+        count_in = settings.get("count_in_enabled", True)
     
-    if '_id' in progress:
-        progress['_id'] = str(progress['_id'])
+    try:
+        pcm = click_track.get_pcm(bpm, time_signature, bars, 1 if count_in else 0)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return progress
+    headers = {
+        "X-Sample-Rate": str(click_track.SAMPLE_RATE),
+        "X-Count-In-Beats": str(beats_per_bar if count_in else 0)
+    }
+    if format == "pcm":
+        return Response(content=click_track.to_l16(pcm), media_type=click_track.l16_media_type(), headers=headers)
+    return Response(content=click_track.to_wav(pcm), media_type="audio/wav", headers=headers)
 
-@api_router.post("/progress/workout")
-async def complete_workout(completion: WorkoutCompletion, user_id: str = "default_user"):
-    """Record a completed workout."""
-    # Get or create progress
+@api_router.get("/exercises/{exercise_id}/midi")
+async def get_exercise_midi(exercise_id: str, bpm: Optional[int] = Query(default=None, ge=20, le=400)):
+    """Export an exercise's tablature as a Standard MIDI File, at `bpm` or the exercise's target tempo."""
+    exercise = await db.exercises.find_one({"id": exercise_id}, {"_id": 0})
+    if not exercise:
+        raise HTTPException(status_code=404, detail="Exercise not found")
+    if not exercise.get("tab_data"):
+        raise HTTPException(status_code=404, detail="Exercise has no tab data")
+    
+    bpm = bpm or exercise.get("bpm_target", 120)
+    key = (exercise.get("content_hash") or content_hash(exercise), bpm)
+    headers = {"Content-Disposition": f'attachment; filename="{exercise_id}-{bpm}bpm.mid"'}
+    cached = midi_cache.get(key)
+    if cached is not None:
+        return Response(content=cached, media_type="audio/midi", headers=headers)
+    
+    # An async generator runs on the event loop (a sync one would be iterated
+    # in the threadpool), so the cache is only ever touched from the loop
+    async def stream():
+        chunks = []
+        for chunk in midi_export.iter_midi(exercise["tab_data"], bpm):
+            chunks.append(chunk)
+            yield chunk
+        midi_cache.put(key, b"".join(chunks))
+    
+    return StreamingResponse(stream(), media_type="audio/midi", headers=headers)
+
+# ============== PROGRESS ENDPOINTS ==============
+
+async def find_or_create_user_doc(collection, model, user_id: str) -> dict:
+    """Get a user's document, creating the default atomically with $setOnInsert on first visit."""
+    doc = await collection.find_one({"user_id": user_id})
+    if doc:
+        return doc
+    
+    defaults = model(user_id=user_id).dict()
+    defaults.pop("user_id")
+    async with sync_write(db) as version:
+        defaults["sync_version"] = version
+        return await collection.find_one_and_update(
+            {"user_id": user_id},
+            {"$setOnInsert": defaults},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+
+async def get_progress_doc(user_id: str) -> dict:
+    """A user's progress document, read through the per-user cache. Don't mutate it."""
+    return await progress_cache.get_or_load(
+        user_id, lambda: find_or_create_user_doc(db.progress, UserProgress, user_id)
+    )
+
+async def get_settings_doc(user_id: str) -> dict:
+    """A user's settings document, read through the per-user cache. Don't mutate it."""
+    return await settings_cache.get_or_load(
+        user_id, lambda: find_or_create_user_doc(db.settings, UserSettings, user_id)
+    )
+
+async def peek_settings(user_id: str) -> dict:
+    """A user's settings for read-only use: cached or stored, else the defaults. Never creates a document."""
+    settings = settings_cache.get(user_id)
+    if settings is None:
+        settings = await db.settings.find_one({"user_id": user_id})
+        if settings is None:
+            return UserSettings(user_id=user_id).dict()
+        settings_cache.put(user_id, settings)
+    return settings
+
+def preferred_duration(settings: dict) -> int:
+    """The stored session length, snapped to a supported one. Numeric strings are accepted; anything else falls back to DEFAULT_DURATION."""
+    try:
+        return nearest_duration(int(settings.get("preferred_duration", DEFAULT_DURATION)))
+    except (TypeError, ValueError, OverflowError):
+        return DEFAULT_DURATION
+
+def serialize_settings(settings: dict) -> dict:
+    settings = dict(settings)
+    settings["preferred_duration"] = preferred_duration(settings)
+    if '_id' in settings:
+        settings['_id'] = str(settings['_id'])
+    return settings
+
+@api_router.get("/progress")
+async def get_user_progress(user_id: str = "default_user", compact: bool = False):
+    """Get user progress. Pass `compact=true` to get completed exercises as a base64 bitmap."""
+    return serialize_progress(await get_progress_doc(user_id), compact)
+
+async def record_workout_completion(user_id: str, completion: WorkoutCompletion) -> dict:
+    """Apply a completed workout to the user's progress and leaderboards; returns the updated document."""
+    # Get or create progress. Read from the database rather than the cache so
+    # another worker's recent update isn't overwritten.
     progress = await db.progress.find_one({"user_id": user_id})
     
     if not progress:
@@ -275,8 +736,11 @@ async def complete_workout(completion: WorkoutCompletion, user_id: str = "defaul
     # Update progress
     progress["completed_workouts"].append(completion.dict())
     progress["total_practice_minutes"] += completion.duration_minutes
-    progress["completed_exercises"].extend(completion.exercises_completed)
-    progress["completed_exercises"] = list(set(progress["completed_exercises"]))  # Dedupe
+    bitmap, extra = completion_bitmap.from_progress(progress, catalog_ordinals)
+    new_bits, unknown = completion_bitmap.encode(completion.exercises_completed, catalog_ordinals)
+    progress.pop("completed_exercises", None)
+    progress["completed_exercises_bitmap"] = completion_bitmap.to_bytes(bitmap | new_bits)
+    progress["completed_exercises_extra"] = list(dict.fromkeys(extra + unknown))
     
     # Update streak
     today = datetime.utcnow().date()
@@ -305,61 +769,258 @@ async def complete_workout(completion: WorkoutCompletion, user_id: str = "defaul
         else:
             progress["current_day"] = completion.day + 1
     
-    await db.progress.update_one(
-        {"user_id": user_id},
-        {"$set": progress},
-        upsert=True
+    progress.pop("_id", None)
+    async with sync_write(db) as version:
+        progress["sync_version"] = version
+        progress = await db.progress.find_one_and_update(
+            {"user_id": user_id},
+            {"$set": progress, "$unset": {"completed_exercises": ""}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    progress_cache.put(user_id, progress)
+    await leaderboards.record_workout(
+        db, user_id, completion.duration_minutes, progress["total_practice_minutes"],
+        progress["streak_days"], progress["last_practice_date"]
     )
-    
-    if '_id' in progress:
-        progress['_id'] = str(progress['_id'])
-    
     return progress
 
+@api_router.post("/progress/workout")
+async def complete_workout(completion: WorkoutCompletion, user_id: str = "default_user", compact: bool = False):
+    """Record a completed workout."""
+    progress = await record_workout_completion(user_id, completion)
+    return serialize_progress(progress, compact)
+
 @api_router.post("/progress/reset")
 async def reset_progress(user_id: str = "default_user"):
     """Reset user progress."""
     new_progress = UserProgress(user_id=user_id).dict()
-    await db.progress.update_one(
-        {"user_id": user_id},
-        {"$set": new_progress},
-        upsert=True
-    )
-    return new_progress
+    async with sync_write(db) as version:
+        new_progress["sync_version"] = version
+        new_progress = await db.progress.find_one_and_update(
+            {"user_id": user_id},
+            {"$set": new_progress, "$unset": {"completed_exercises": ""}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    progress_cache.put(user_id, new_progress)
+    await leaderboards.remove_user(db, user_id)
+    return serialize_progress(new_progress)
 
 # ============== SETTINGS ENDPOINTS ==============
 
 @api_router.get("/settings")
 async def get_settings(user_id: str = "default_user"):
     """Get user settings."""
-    settings = await db.settings.find_one({"user_id": user_id})
-    
-    if not settings:
-        settings = UserSettings(user_id=user_id).dict()
-        await db.settings.insert_one(settings)
-    
-    if '_id' in settings:
-        settings['_id'] = str(settings['_id'])
-    
-    return settings
+    return serialize_settings(await get_settings_doc(user_id))
 
 @api_router.put("/settings")
 async def update_settings(updates: Dict[str, Any], user_id: str = "default_user"):
     """Update user settings."""
-    await db.settings.update_one(
-        {"user_id": user_id},
-        {"$set": updates},
-        upsert=True
-    )
+    async with sync_write(db) as version:
+        settings = await db.settings.find_one_and_update(
+            {"user_id": user_id},
+            {"$set": {**updates, "sync_version": version}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    settings_cache.put(user_id, settings)
     
-    settings = await db.settings.find_one({"user_id": user_id})
-    if '_id' in settings:
-        settings['_id'] = str(settings['_id'])
+    return serialize_settings(settings)
+
+# ============== LEADERBOARD ENDPOINTS ==============
+
+@api_router.get("/leaderboards/{board}")
+async def get_leaderboard(
+    board: str,
+    period: str = "week",
+    limit: int = Query(default=10, ge=1, le=100),
+    user_id: Optional[str] = None
+):
+    """Top practice minutes or best streaks for `period` ("all", "week" or a week key like 2026-W07).
+    Pass `user_id` to also get that user's rank."""
+    if board not in leaderboards.BOARDS:
+        raise HTTPException(status_code=404, detail="Leaderboard not found")
+    period = leaderboards.resolve_period(period)
     
-    return settings
+    entries = await leaderboards.top(db, board, period, limit)
+    me = await leaderboards.rank_of(db, board, period, user_id) if user_id else None
+    return {
+        "board": board,
+        "period": period,
+        "entries": entries,
+        "me": me
+    }
+
+# ============== LIVE PRACTICE ENDPOINTS ==============
+
+@api_router.websocket("/practice/{exercise_id}/live")
+async def live_practice(
+    websocket: WebSocket,
+    exercise_id: str,
+    user_id: str = "default_user",
+    week: Optional[int] = None,
+    day: Optional[int] = None
+):
+    """Live practice session over a WebSocket.
+
+    Client messages: {"type": "attempt", "onsets": [...]} after each run
+    through the exercise, {"type": "ping"}, and {"type": "finish"}. The
+    server answers with "state", "feedback" (scores plus the next ladder
+    tempo), "pong", periodic "heartbeat" and a final "complete" once the
+    session is recorded as a workout for `week`/`day` (the user's current
+    day by default).
+    """
+    exercise = await db.exercises.find_one(
+        {"id": exercise_id}, {"_id": 0, "id": 1, "bpm_start": 1, "bpm_target": 1, "tags": 1, "success_criteria": 1}
+    )
+    if not exercise:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    
+    session = PracticeSession(exercise)
+    channel = Channel(websocket)
+    channel.start()
+    practice_session.stats["active"] += 1
+    practice_session.stats["opened"] += 1
+    close_code = None
+    try:
+        channel.send(session.state())
+        while not channel.closed:
+            try:
+                message = await asyncio.wait_for(websocket.receive_json(), timeout=practice_session.IDLE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                practice_session.stats["idle_timeouts"] += 1
+                close_code = practice_session.IDLE
+                break
+            except ValueError:
+                channel.send({"type": "error", "detail": "Messages must be JSON"})
+                continue
+            
+            kind = message.get("type") if isinstance(message, dict) else None
+            if kind == "attempt":
+                try:
+                    attempt = TimingAttempt(onsets=message.get("onsets"))
+                except ValidationError:
+                    channel.send({"type": "error", "detail": "Attempt needs a list of onset times"})
+                    continue
+                channel.send(session.score(attempt.onsets))
+            elif kind == "ping":
+                channel.send({"type": "pong", "t": message.get("t")})
+            elif kind == "finish":
+                if not session.attempts:
+                    channel.send({"type": "error", "detail": "Nothing to record: no attempts yet"})
+                    continue
+                progress = await get_progress_doc(user_id)
+                completion = WorkoutCompletion(
+                    week=week or progress.get("current_week", 1),
+                    day=day or progress.get("current_day", 1),
+                    duration_minutes=session.duration_minutes(),
+                    exercises_completed=[exercise_id] if session.passed else []
+                )
+                progress = await record_workout_completion(user_id, completion)
+                practice_session.stats["completed"] += 1
+                channel.send({
+                    "type": "complete",
+                    "completion": completion.dict(),
+                    "summary": session.summary(),
+                    "streak_days": progress.get("streak_days", 0)
+                })
+                close_code = 1000
+                break
+            else:
+                channel.send({"type": "error", "detail": f"Unknown message type {kind}"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        practice_session.stats["active"] -= 1
+        await channel.close(close_code)
+
+# ============== TELEMETRY ENDPOINTS ==============
+
+@api_router.post("/telemetry", status_code=202)
+async def ingest_telemetry(batch: TelemetryBatch, user_id: str = "default_user"):
+    """Queue a batch of practice events (timing offsets, tempo changes, mistakes) for storage.
+
+    Responds 503 with Retry-After when the write queue is full.
+    """
+    meta = {"user_id": user_id, "session_id": batch.session_id, "exercise_id": batch.exercise_id}
+    docs = [
+        {
+            "ts": batch.started_at + timedelta(seconds=event.t),
+            "meta": {**meta, "kind": event.kind},
+            "value": event.value,
+            "data": event.data
+        }
+        for event in batch.events
+    ]
+    if not telemetry_buffer.offer(docs):
+        raise HTTPException(status_code=503, detail="Telemetry queue full", headers={"Retry-After": "1"})
+    return {"accepted": len(docs)}
+
+# ============== BOOTSTRAP ENDPOINT ==============
+
+@api_router.get("/bootstrap")
+async def bootstrap(user_id: str = "default_user", compact: bool = False):
+    """Everything the app needs at launch in one call: progress, settings, phases and today's workout.
+
+    Progress, settings and phases are fetched concurrently; today's workout
+    then follows the user's current week/day and usually comes from the
+    workout cache.
+    """
+    progress, settings, phases = await asyncio.gather(
+        get_progress_doc(user_id),
+        get_settings_doc(user_id),
+        db.phases.find({}, {"_id": 0}).sort("weeks_start", 1).to_list(10)
+    )
+    today = await get_today(
+        progress.get("current_week", 1),
+        progress.get("current_day", 1),
+        preferred_duration(settings)
+    )
+    return {
+        "progress": serialize_progress(progress, compact),
+        "settings": serialize_settings(settings),
+        "phases": phases,
+        "today": today
+    }
+
+# ============== SYNC ENDPOINTS ==============
+
+@api_router.get("/sync")
+async def sync_changes(since: int = 0, user_id: str = "default_user", compact: bool = False):
+    """Get catalog, curriculum and user documents changed since a sync token.
+
+    Start from the `sync_token` of /export (or 0 for everything) and pass the
+    returned `token` next time. `tombstones` lists deleted documents.
+    """
+    changes = await changes_since(db, since, user_id)
+    if changes["progress"]:
+        changes["progress"] = serialize_progress(changes["progress"], compact)
+    if changes["settings"]:
+        changes["settings"] = serialize_settings(changes["settings"])
+    return changes
 
 # ============== STATS ENDPOINTS ==============
 
+@api_router.get("/metrics")
+async def get_metrics():
+    """Get in-process cache counters."""
+    return {
+        "workout_cache": workout_cache.stats(),
+        "click_track_cache": click_track.cache_stats(),
+        "midi_cache": midi_cache.stats(),
+        "settings_cache": settings_cache.stats(),
+        "progress_cache": progress_cache.stats(),
+        "rate_limiter": rate_limiter.stats(),
+        "telemetry": telemetry_buffer.stats(),
+        "analysis_pool": analysis_pool.stats(),
+        "practice_sessions": practice_session.stats,
+        "cpu_pool": cpu_pool.stats(),
+        "event_loop_lag": loop_monitor.stats()
+    }
+
 @api_router.get("/stats")
 async def get_stats():
     """Get overall stats."""
@@ -392,6 +1053,35 @@ async def get_stats():
 # Include the router
 app.include_router(api_router)
 
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    """FastAPI's 422, except that non-finite inputs (JSON 1e999 parses as inf) are echoed as strings instead of failing to encode."""
+    errors = json.loads(json.dumps(jsonable_encoder(exc.errors())), parse_constant=str)
+    return JSONResponse(status_code=422, content={"detail": errors})
+
+# Rate limiting: per-client token buckets (rate per second, burst) by route, and
+# a global cap on concurrent expensive requests. Clients are keyed by IP, read
+# from X-Forwarded-For behind the proxies in TRUSTED_PROXIES (comma-separated
+# addresses or CIDR ranges). Added before CORS so 429s still carry CORS headers.
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+TRUSTED_PROXIES = os.environ.get('TRUSTED_PROXIES', DEFAULT_TRUSTED_PROXIES).split(',')
+rate_limiter = RateLimiter(
+    rules=[
+        RouteLimit("workout", "POST", r"/api/progress/workout", rate=0.2, burst=5),
+        # Live sessions record a workout when finished, so they draw on the same bucket
+        RouteLimit("workout", "WEBSOCKET", r"/api/practice/[^/]+/live", rate=0.2, burst=5),
+        RouteLimit("telemetry", "POST", r"/api/telemetry", rate=5, burst=20),
+        RouteLimit("search", "GET", r"/api/exercises", rate=2, burst=10, expensive=True, when_param="search"),
+        RouteLimit("export", "GET", r"/api/export", rate=0.05, burst=3, expensive=True),
+        RouteLimit("audio", "GET", r"/api/(click-track|exercises/[^/]+/midi)", rate=2, burst=10, expensive=True),
+        RouteLimit("recording", "POST", r"/api/exercises/[^/]+/recording", rate=0.2, burst=5, expensive=True),
+    ],
+    default=RouteLimit("default", "*", r".*", rate=20, burst=40),
+    max_expensive_in_flight=int(os.environ.get('RATE_LIMIT_MAX_EXPENSIVE', 16))
+)
+if RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware, limiter=rate_limiter, trusted_proxies=TRUSTED_PROXIES)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -401,6 +1091,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so rate-limited and CORS-rejected requests are logged too
+if ACCESS_LOG_ENABLED:
+    configure_json_logging()
+    app.add_middleware(AccessLogMiddleware)
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await telemetry_buffer.stop()
+    await loop_monitor.stop()
+    analysis_pool.shutdown()
+    cpu_pool.shutdown()
     client.close()
@@ -0,0 +1,56 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+
+class MongoLease:
+    """A named lease stored as a single document, used to elect one process for startup work.
+
+    The lease expires after `ttl_seconds` so a crashed holder can't block other
+    processes forever; the holder should `renew()` during long-running work.
+    """
+
+    def __init__(self, collection, name: str, ttl_seconds: float = 60):
+        self.collection = collection
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def acquire(self) -> bool:
+        """Take the lease if it is free, expired or already ours."""
+        now = datetime.utcnow()
+        try:
+            await self.collection.update_one(
+                {
+                    "_id": self.name,
+                    "$or": [{"owner": self.owner}, {"expires_at": {"$lt": now}}]
+                },
+                {"$set": {
+                    "owner": self.owner,
+                    "acquired_at": now,
+                    "expires_at": now + timedelta(seconds=self.ttl_seconds)
+                }},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # The document exists and is held by someone else
+            return False
+
+    async def renew(self) -> bool:
+        result = await self.collection.update_one(
+            {"_id": self.name, "owner": self.owner},
+            {"$set": {"expires_at": datetime.utcnow() + timedelta(seconds=self.ttl_seconds)}}
+        )
+        return result.matched_count == 1
+
+    async def release(self):
+        await self.collection.delete_one({"_id": self.name, "owner": self.owner})
+
+    async def is_held(self) -> bool:
+        """Whether another live process holds the lease."""
+        doc = await self.collection.find_one({"_id": self.name})
+        return bool(doc) and doc["owner"] != self.owner and doc["expires_at"] > datetime.utcnow()
@@ -0,0 +1,121 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+# Collections whose documents carry a `sync_version` stamp
+CATALOG_SYNC_COLLECTIONS = ("exercises", "phases", "weeks", "day_variants")
+USER_SYNC_COLLECTIONS = ("progress", "settings")
+
+# A write still pending after this long is assumed to have died and no longer
+# holds back the sync token
+PENDING_TTL_SECONDS = 300
+
+
+async def next_sync_version(db) -> int:
+    """Allocate the next value of the global, monotonically increasing sync version."""
+    counter = await db.counters.find_one_and_update(
+        {"_id": "sync_version"},
+        {"$inc": {"value": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter["value"]
+
+
+async def current_sync_version(db) -> int:
+    """The highest sync version allocated so far, whether or not its write has finished."""
+    counter = await db.counters.find_one({"_id": "sync_version"})
+    return counter["value"] if counter else 0
+
+
+def _abandoned(pending: dict, now: datetime) -> bool:
+    return pending["started_at"] <= now - timedelta(seconds=PENDING_TTL_SECONDS)
+
+
+@asynccontextmanager
+async def sync_write(db):
+    """Allocate a sync version for a write and hold the sync token below it until the write is done.
+
+    The version is allocated and registered as pending in the same pipeline
+    update of the counter document, and released with one `$unset` once the
+    block exits: two round trips on top of the write itself. The release also
+    drops pending versions abandoned by writers that died.
+    """
+    key = str(ObjectId())
+    counter = await db.counters.find_one_and_update(
+        {"_id": "sync_version"},
+        [
+            {"$set": {"value": {"$add": [{"$ifNull": ["$value", 0]}, 1]}}},
+            {"$set": {f"pending.{key}": {"version": "$value", "started_at": datetime.utcnow()}}},
+        ],
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    now = datetime.utcnow()
+    release = [key] + [other for other, pending in counter["pending"].items() if _abandoned(pending, now)]
+    try:
+        yield counter["value"]
+    finally:
+        await db.counters.update_one({"_id": "sync_version"}, {"$unset": {f"pending.{k}": "" for k in release}})
+
+
+async def sync_token(db) -> int:
+    """The low watermark clients resume from: every version up to it has been written.
+
+    The counter and the pending versions live in one document, so a single
+    read sees them consistently.
+    """
+    counter = await db.counters.find_one({"_id": "sync_version"}) or {}
+    now = datetime.utcnow()
+    pending = [p["version"] for p in counter.get("pending", {}).values() if not _abandoned(p, now)]
+    return min(pending) - 1 if pending else counter.get("value", 0)
+
+
+async def add_tombstones(db, collection: str, keys: Iterable, version: int, user_id: Optional[str] = None):
+    """Record deletions so clients syncing from an older token can drop the documents."""
+    docs = [
+        {"collection": collection, "key": key, "user_id": user_id, "sync_version": version, "deleted_at": datetime.utcnow()}
+        for key in keys
+    ]
+    if docs:
+        await db.tombstones.insert_many(docs)
+
+
+async def ensure_sync_indexes(db):
+    for name in CATALOG_SYNC_COLLECTIONS:
+        await db[name].create_index("sync_version")
+    await db.tombstones.create_index([("sync_version", 1), ("user_id", 1)])
+
+
+async def backfill_sync_versions(db):
+    """Stamp documents written before sync versions existed, so a sync from 0 returns them. Runs once."""
+    if await db.meta.find_one({"_id": "sync_backfill"}):
+        return
+    for name in CATALOG_SYNC_COLLECTIONS + USER_SYNC_COLLECTIONS:
+        if await db[name].find_one({"sync_version": None}, {"_id": 1}):
+            async with sync_write(db) as version:
+                await db[name].update_many({"sync_version": None}, {"$set": {"sync_version": version}})
+    await db.meta.update_one({"_id": "sync_backfill"}, {"$set": {"done_at": datetime.utcnow()}}, upsert=True)
+
+
+async def changes_since(db, since: int, user_id: str) -> dict:
+    """Documents changed after `since`, plus tombstones, and the token to pass next time.
+
+    The token is the low watermark of finished writes, read before querying;
+    documents stamped after it are returned again on the next sync, which
+    clients apply idempotently.
+    """
+    token = await sync_token(db)
+    changes = {"token": token}
+    for name in CATALOG_SYNC_COLLECTIONS:
+        changes[name] = await db[name].find({"sync_version": {"$gt": since}}, {"_id": 0}).to_list(None)
+    for name in USER_SYNC_COLLECTIONS:
+        changes[name] = await db[name].find_one({"user_id": user_id, "sync_version": {"$gt": since}})
+    changes["tombstones"] = await db.tombstones.find(
+        {"sync_version": {"$gt": since}, "user_id": {"$in": [None, user_id]}},
+        {"_id": 0, "collection": 1, "key": 1}
+    ).to_list(None)
+    return changes
@@ -0,0 +1,124 @@
+import math
+import struct
+from array import array
+from typing import Any, Dict, List, Optional
+
+# Fret value used for muted ("x") notes in the numeric encodings
+MUTED_FRET = -1
+
+# Binary layout (little-endian):
+#   magic  b"TAB1"
+#   header <H B B B>   note count, time signature numerator/denominator, string count
+#   strings            int8 per tuned string
+#   articulation names u8 count, then u8 length + utf-8 bytes each
+#   columns            int8 strings[n], int8 frets[n], float32 beats[n] (NaN = none), uint8 articulations[n]
+MAGIC = b"TAB1"
+
+
+def _encode_fret(fret) -> int:
+    return MUTED_FRET if fret in ("x", "X", None) else int(fret)
+
+
+def _decode_fret(fret: int):
+    return "x" if fret == MUTED_FRET else fret
+
+
+def to_columns(tab_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert per-note tab data into parallel arrays.
+
+    Articulations (currently the pick `direction`) are stored as indexes into
+    `articulation_names`, where index 0 means none.
+    """
+    notes = tab_data.get("notes", [])
+    articulation_names = [""]
+    articulations = []
+    for note in notes:
+        name = note.get("direction") or ""
+        if name not in articulation_names:
+            articulation_names.append(name)
+        articulations.append(articulation_names.index(name))
+    return {
+        "time_signature": tab_data.get("time_signature", "4/4"),
+        "tuning_strings": tab_data.get("strings", []),
+        "count": len(notes),
+        "strings": [note["string"] for note in notes],
+        "frets": [_encode_fret(note.get("fret")) for note in notes],
+        "beats": [note.get("beat") for note in notes],
+        "articulations": articulations,
+        "articulation_names": articulation_names,
+    }
+
+
+def from_columns(columns: Dict[str, Any]) -> Dict[str, Any]:
+    """Inverse of `to_columns`."""
+    names = columns["articulation_names"]
+    notes: List[Dict[str, Any]] = []
+    for string, fret, beat, articulation in zip(
+        columns["strings"], columns["frets"], columns["beats"], columns["articulations"]
+    ):
+        note = {"fret": _decode_fret(fret), "string": string}
+        if beat is not None:
+            note["beat"] = beat
+        if articulation:
+            note["direction"] = names[articulation]
+        notes.append(note)
+    return {
+        "notes": notes,
+        "time_signature": columns["time_signature"],
+        "strings": columns["tuning_strings"],
+    }
+
+
+def pack(tab_data: Dict[str, Any]) -> bytes:
+    """Encode tab data into the compact binary layout described above."""
+    columns = to_columns(tab_data)
+    numerator, denominator = (int(x) for x in columns["time_signature"].split("/"))
+    out = bytearray(MAGIC)
+    out += struct.pack("<HBBB", columns["count"], numerator, denominator, len(columns["tuning_strings"]))
+    out += array("b", columns["tuning_strings"]).tobytes()
+    out += struct.pack("<B", len(columns["articulation_names"]))
+    for name in columns["articulation_names"]:
+        encoded = name.encode("utf-8")
+        out += struct.pack("<B", len(encoded)) + encoded
+    out += array("b", columns["strings"]).tobytes()
+    out += array("b", columns["frets"]).tobytes()
+    out += struct.pack(f"<{columns['count']}f", *(math.nan if b is None else b for b in columns["beats"]))
+    out += array("B", columns["articulations"]).tobytes()
+    return bytes(out)
+
+
+def unpack(data: bytes) -> Dict[str, Any]:
+    """Decode the binary layout back into per-note tab data."""
+    if data[:4] != MAGIC:
+        raise ValueError("Not a TAB1 payload")
+    offset = 4
+    count, numerator, denominator, string_count = struct.unpack_from("<HBBB", data, offset)
+    offset += 5
+    tuning = list(array("b", data[offset:offset + string_count]))
+    offset += string_count
+    (name_count,) = struct.unpack_from("<B", data, offset)
+    offset += 1
+    names = []
+    for _ in range(name_count):
+        (length,) = struct.unpack_from("<B", data, offset)
+        names.append(data[offset + 1:offset + 1 + length].decode("utf-8"))
+        offset += 1 + length
+    strings = list(array("b", data[offset:offset + count]))
+    offset += count
+    frets = list(array("b", data[offset:offset + count]))
+    offset += count
+    beats: List[Optional[float]] = [
+        None if math.isnan(b) else b for b in struct.unpack_from(f"<{count}f", data, offset)
+    ]
+    offset += 4 * count
+    articulations = list(array("B", data[offset:offset + count]))
+    return from_columns({
+        "time_signature": f"{numerator}/{denominator}",
+        "tuning_strings": tuning,
+        "count": count,
+        "strings": strings,
+        "frets": frets,
+        "beats": beats,
+        "articulations": articulations,
+        "articulation_names": names,
+    })
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from collections import deque
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+
+async def ensure_collection(db):
+    """Create `telemetry` as a time-series collection where the server supports it (MongoDB 5.0+)."""
+    if "telemetry" in await db.list_collection_names():
+        return
+    try:
+        await db.create_collection("telemetry", timeseries={"timeField": "ts", "metaField": "meta", "granularity": "seconds"})
+    except Exception as e:
+        if "telemetry" in await db.list_collection_names():
+            # Another worker created it first
+            return
+        logger.warning(f"Could not create time-series telemetry collection, using a regular one: {e}")
+        await db.telemetry.create_index([("meta.user_id", 1), ("ts", 1)])
+
+
+class TelemetryBuffer:
+    """Bounded in-process queue of telemetry documents, flushed with large insert_many batches.
+
+    `offer` never waits: when the queue can't take a whole batch it is
+    refused, and the caller should tell the client to back off.
+    """
+
+    def __init__(self, collection, max_queue: int = 50000, batch_size: int = 1000, flush_interval: float = 1.0):
+        self.collection = collection
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: deque = deque()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.accepted = 0
+        self.rejected = 0
+        self.flushed = 0
+        self.failed = 0
+
+    def offer(self, docs: List[dict]) -> bool:
+        if len(self.queue) + len(docs) > self.max_queue:
+            self.rejected += len(docs)
+            return False
+        self.queue.extend(docs)
+        self.accepted += len(docs)
+        if len(self.queue) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background flusher and write out whatever is still queued."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self.queue:
+            await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self.queue:
+                await self.flush()
+
+    async def flush(self):
+        batch = [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+        if not batch:
+            return
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+            self.flushed += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Dropped {len(batch)} telemetry events: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self.queue),
+            "max_queue": self.max_queue,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "flushed": self.flushed,
+            "failed": self.failed,
+        }
@@ -0,0 +1,159 @@
+import warnings
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+# A note counts as on time within this fraction of the grid interval, capped in seconds
+TOLERANCE_FRACTION = 0.1
+TOLERANCE_MAX_SECONDS = 0.030
+
+# An attempt only passes when its median inter-onset interval is within this
+# fraction of the grid interval, whatever the exercise's criteria
+TEMPO_TOLERANCE = 0.05
+
+# Subdivisions implied by exercise tags; quarter notes otherwise
+TAG_SUBDIVISIONS = {"eighth-notes": 2, "triplets": 3, "shuffle": 3, "sixteenth-notes": 4}
+
+# success_criteria keys that name one of the computed metrics
+CRITERIA_METRICS = {
+    "timing_accuracy": "timing_accuracy",
+    "timing": "timing_accuracy",
+    "consistency": "consistency",
+    "evenness": "evenness",
+    "triplet_evenness": "subdivision_evenness",
+    "tempo_accuracy": "tempo_accuracy",
+}
+
+METRICS = ("timing_accuracy", "consistency", "evenness", "subdivision_evenness", "tempo_accuracy", "tempo_ratio",
+           "drift_ms_per_s", "onsets")
+
+
+def subdivision_for(exercise: dict) -> int:
+    for tag in exercise.get("tags", []):
+        if tag in TAG_SUBDIVISIONS:
+            return TAG_SUBDIVISIONS[tag]
+    return 1
+
+
+def pad(attempts: Iterable[Sequence[float]]) -> np.ndarray:
+    """Stack attempts of different lengths into one NaN-padded (attempts, onsets) array."""
+    attempts = [np.sort(np.asarray(a, dtype=np.float64)) for a in attempts]
+    width = max((len(a) for a in attempts), default=0)
+    out = np.full((len(attempts), width), np.nan)
+    for row, onsets in zip(out, attempts):
+        row[:len(onsets)] = onsets
+    return out
+
+
+def score_batch(onsets: np.ndarray, bpm, subdivision=1) -> Dict[str, np.ndarray]:
+    """Score many attempts at once.
+
+    `onsets` is a (attempts, notes) array of sorted onset times in seconds,
+    left-aligned and NaN-padded; `bpm` and `subdivision` are scalars or
+    per-attempt arrays. Notes are assigned grid slots by rounding each
+    inter-onset gap to whole slots, so skipped notes and gradual drift don't
+    shift the rest, then measured against the target-tempo grid whose phase
+    best fits the attempt. Skipped slots count as missed notes, and
+    `tempo_ratio` (median inter-onset interval over the grid interval) shows
+    half or double time.
+    Returns one array per metric; scores are 0-100, NaN with fewer than two notes.
+    """
+    onsets = np.atleast_2d(np.asarray(onsets, dtype=np.float64))
+    attempts = onsets.shape[0]
+    interval = (60.0 / (np.broadcast_to(np.asarray(bpm, dtype=np.float64), (attempts,))
+                        * np.broadcast_to(np.asarray(subdivision), (attempts,))))[:, None]
+    valid = ~np.isnan(onsets)
+    count = valid.sum(axis=1)
+    scorable = count >= 2
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        # Empty or single-note slices produce NaN metrics, which is intended
+        warnings.simplefilter("ignore", RuntimeWarning)
+        # Grid alignment: phase is the median offset of notes from their slots
+        relative = onsets - onsets[:, :1]
+        steps = np.rint(np.diff(onsets, axis=1) / interval)
+        slots = np.concatenate([np.zeros((attempts, 1)), np.nancumsum(steps, axis=1)], axis=1)
+        start = onsets[:, :1] + np.nanmedian(relative - slots * interval, axis=1, keepdims=True)
+        deviation = onsets - (start + slots * interval)
+
+        tolerance = np.minimum(TOLERANCE_FRACTION * interval, TOLERANCE_MAX_SECONDS)
+        on_time = (np.abs(deviation) <= tolerance) & valid
+        skipped = np.nansum(np.maximum(steps - 1, 0), axis=1)
+        timing_accuracy = 100.0 * on_time.sum(axis=1) / (count + skipped)
+
+        consistency = 100.0 * np.clip(1 - np.nanstd(deviation, axis=1) / (interval[:, 0] / 4), 0, 1)
+
+        # Evenness: spread of inter-onset intervals, normalised by the slots they span
+        ioi = np.diff(onsets, axis=1) / steps
+        ioi[~(steps > 0)] = np.nan
+        evenness = 100.0 * np.clip(1 - 2 * np.nanstd(ioi, axis=1) / np.nanmean(ioi, axis=1), 0, 1)
+
+        # Same, only between notes inside one beat (e.g. the three notes of a triplet)
+        beat = np.floor_divide(slots, np.broadcast_to(np.asarray(subdivision), (attempts,))[:, None])
+        within_beat = np.where(np.diff(beat, axis=1) == 0, ioi, np.nan)
+        subdivision_evenness = 100.0 * np.clip(
+            1 - 2 * np.nanstd(within_beat, axis=1) / np.nanmean(within_beat, axis=1), 0, 1
+        )
+
+        # Drift: least-squares slope of deviation over time (seconds late per second played)
+        t = np.where(valid, onsets, np.nan)
+        t_centered = t - np.nanmean(t, axis=1, keepdims=True)
+        d_centered = deviation - np.nanmean(deviation, axis=1, keepdims=True)
+        slope = np.nansum(t_centered * d_centered, axis=1) / np.nansum(t_centered ** 2, axis=1)
+        slope = np.nan_to_num(slope)
+
+        # Tempo: the played tempo against the target, or the drift across the
+        # attempt, whichever is further off
+        tempo_ratio = np.nanmedian(np.diff(onsets, axis=1), axis=1) / interval[:, 0]
+        tempo_error = np.maximum(np.abs(tempo_ratio - 1), np.abs(slope / (1 + slope)))
+        tempo_accuracy = 100.0 * np.clip(1 - 10 * tempo_error, 0, 1)
+
+    metrics = {
+        "timing_accuracy": timing_accuracy,
+        "consistency": consistency,
+        "evenness": evenness,
+        "subdivision_evenness": subdivision_evenness,
+        "tempo_accuracy": tempo_accuracy,
+        "tempo_ratio": tempo_ratio,
+        "drift_ms_per_s": slope * 1000.0,
+    }
+    for name, values in metrics.items():
+        values[~scorable] = np.nan
+    metrics["onsets"] = count
+    return metrics
+
+
+def score_attempt(onsets: Sequence[float], bpm: float, subdivision: int = 1) -> Dict[str, Optional[float]]:
+    """Metrics for a single attempt as plain floats (None where not computable)."""
+    batch = score_batch(pad([onsets]), bpm, subdivision)
+    result = {}
+    for name in METRICS:
+        value = float(batch[name][0])
+        result[name] = None if np.isnan(value) else round(value, 2)
+    result["onsets"] = int(batch["onsets"][0])
+    return result
+
+
+def evaluate(metrics: Dict[str, Optional[float]], success_criteria: Dict[str, float]) -> dict:
+    """Check metrics against an exercise's success_criteria.
+
+    Criteria the timing engine can't measure (tone, muting, ...) are listed
+    under `unscored`; the attempt passes when every scored criterion does and
+    it was played at the target tempo (not, say, at half time).
+    """
+    criteria = {}
+    unscored: List[str] = []
+    for name, target in success_criteria.items():
+        metric = CRITERIA_METRICS.get(name)
+        if metric is None:
+            unscored.append(name)
+            continue
+        score = metrics.get(metric)
+        criteria[name] = {"target": target, "score": score, "passed": score is not None and score >= target}
+    tempo_ratio = metrics.get("tempo_ratio")
+    on_tempo = tempo_ratio is not None and abs(tempo_ratio - 1) <= TEMPO_TOLERANCE
+    return {
+        "passed": on_tempo and bool(criteria) and all(c["passed"] for c in criteria.values()),
+        "on_tempo": on_tempo,
+        "criteria": criteria,
+        "unscored": unscored,
+    }
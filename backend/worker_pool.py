@@ -0,0 +1,62 @@
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class PoolBusy(Exception):
+    """Raised when a pool already has `max_pending` jobs running or queued."""
+
+
+class BoundedPool:
+    """Runs blocking or CPU-heavy functions off the event loop, with a cap on queued work.
+
+    The executor is created on first use. Jobs beyond `max_pending` are
+    refused with PoolBusy rather than queued, so callers can shed load.
+    Process pools use the spawn start method so workers don't inherit the
+    event loop or open database connections.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_pending: int, processes: bool = False):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.processes = processes
+        self.executor: Executor = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> Executor:
+        if self.executor is None:
+            if self.processes:
+                self.executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self.executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix=self.name)
+        return self.executor
+
+    async def run(self, fn, *args, **kwargs):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PoolBusy(f"{self.name} pool is busy")
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), functools.partial(fn, *args, **kwargs))
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,51 @@
+"""Shared test fixtures. Backend modules are imported from backend/."""
+import asyncio
+import functools
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+MONGO_TEST_URL = os.environ.get("MONGO_TEST_URL", "mongodb://localhost:27017")
+
+
+@functools.lru_cache(maxsize=1)
+def mongod_reachable() -> bool:
+    pymongo = pytest.importorskip("pymongo")
+    client = pymongo.MongoClient(MONGO_TEST_URL, serverSelectionTimeoutMS=500)
+    try:
+        client.admin.command("ping")
+        return True
+    except pymongo.errors.PyMongoError:
+        return False
+    finally:
+        client.close()
+
+
+def motor_client():
+    """A motor client for MONGO_TEST_URL, or an in-memory mongomock_motor client when no mongod is reachable."""
+    if mongod_reachable():
+        from motor.motor_asyncio import AsyncIOMotorClient
+        return AsyncIOMotorClient(MONGO_TEST_URL)
+    mongomock_motor = pytest.importorskip("mongomock_motor", reason=f"No mongod at {MONGO_TEST_URL} and no mongomock_motor")
+    return mongomock_motor.AsyncMongoMockClient()
+
+
+@pytest.fixture
+def with_db():
+    """Run `scenario(db)` on a fresh, throwaway database and return its result."""
+    def run(scenario):
+        async def main():
+            client = motor_client()
+            db = client[f"guitar_gym_test_{uuid.uuid4().hex[:8]}"]
+            try:
+                return await scenario(db)
+            finally:
+                await client.drop_database(db.name)
+                client.close()
+        return asyncio.run(main())
+    return run
@@ -0,0 +1,60 @@
+"""Unit tests for completion bitmaps keyed by catalog ordinal."""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import completion_bitmap  # noqa: E402
+from completion_bitmap import CatalogOrdinals  # noqa: E402
+
+
+def make_ordinals(*pairs) -> CatalogOrdinals:
+    ordinals = CatalogOrdinals()
+    ordinals.load(pairs)
+    return ordinals
+
+
+def test_encode_decode_round_trip():
+    ordinals = make_ordinals(("a", 0), ("b", 1), ("c", 5))
+    bitmap, unknown = completion_bitmap.encode(["c", "a", "zzz"], ordinals)
+    assert unknown == ["zzz"]
+    assert completion_bitmap.decode(bitmap, ordinals) == ["a", "c"]
+    assert completion_bitmap.from_bytes(completion_bitmap.to_bytes(bitmap)) == bitmap
+
+
+def test_assign_never_reuses_ordinals():
+    ordinals = make_ordinals(("a", 0), ("b", 3))
+    assert ordinals.assign(["b", "c", "d"]) == {"c": 4, "d": 5}
+
+
+def test_legacy_list_is_converted():
+    ordinals = make_ordinals(("a", 0), ("b", 1))
+    bitmap, extra = completion_bitmap.from_progress({"completed_exercises": ["b", "old"]}, ordinals)
+    assert completion_bitmap.decode(bitmap, ordinals) == ["b"]
+    assert extra == ["old"]
+
+
+def test_extra_that_gained_an_ordinal_moves_into_bitmap():
+    # "new" was completed before it had an ordinal, then completed again after
+    ordinals = make_ordinals(("a", 0), ("new", 1))
+    progress = {
+        "completed_exercises_bitmap": completion_bitmap.to_bytes(0b11),
+        "completed_exercises_extra": ["new", "gone"],
+    }
+    bitmap, extra = completion_bitmap.from_progress(progress, ordinals)
+    assert completion_bitmap.decode(bitmap, ordinals) == ["a", "new"]
+    assert extra == ["gone"]
+    assert completion_bitmap.count(bitmap, ordinals) + len(extra) == 3
+
+
+def test_retired_ordinals_are_not_counted():
+    # Ordinal 1 belonged to an exercise that has left the catalog
+    ordinals = make_ordinals(("a", 0), ("c", 2))
+    bitmap = 0b111
+    assert completion_bitmap.decode(bitmap, ordinals) == ["a", "c"]
+    assert completion_bitmap.count(bitmap, ordinals) == 2
+    assert completion_bitmap.percentage(bitmap, ordinals) == 100.0
+
+
+def test_percentage_of_empty_catalog():
+    assert completion_bitmap.percentage(0b1, CatalogOrdinals()) == 0.0
@@ -0,0 +1,43 @@
+"""Unit tests for the exercise completeness validator."""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from exercise_validator import validate_exercise  # noqa: E402
+
+
+def make_exercise(**overrides) -> dict:
+    exercise = {
+        "id": "ex-1",
+        "title": "Quarter Note Foundations",
+        "domain": "Timing & Rhythm",
+        "difficulty_tier": "Beginner",
+        "description_training": "Play along with the click.",
+        "steps": ["Set the metronome"],
+        "mistakes_and_fixes": [{"mistake": "Rushing", "fix": "Count aloud"}],
+        "success_criteria": ["Stay with the click"],
+        "bpm_start": 60,
+        "bpm_target": 90,
+    }
+    exercise.update(overrides)
+    return exercise
+
+
+def test_complete_exercise_is_playable():
+    assert validate_exercise(make_exercise()) == []
+
+
+def test_tab_required_only_where_played_note_for_note():
+    assert validate_exercise(make_exercise(domain="Scales & Fretboard")) == ["missing tab_data"]
+    assert validate_exercise(make_exercise(domain="Chords & Harmony")) == []
+    tab = {"notes": [{"string": 0, "fret": 5}]}
+    assert validate_exercise(make_exercise(domain="Scales & Fretboard", tab_data=tab)) == []
+
+
+def test_malformed_tab_is_reported():
+    tab = {"notes": [{"string": 7, "fret": 5}, {"string": 0, "fret": 30}]}
+    assert validate_exercise(make_exercise(tab_data=tab)) == [
+        "tab note 0 has an invalid string",
+        "tab note 1 has an invalid fret",
+    ]
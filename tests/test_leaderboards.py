@@ -0,0 +1,105 @@
+"""Minutes and best-streak leaderboards, and ranks read from their score counts."""
+import random
+from datetime import datetime, timedelta
+
+import leaderboards
+
+MONDAY = datetime(2026, 2, 9, 12)
+
+
+def test_minutes_accumulate_per_period(with_db):
+    async def scenario(db):
+        await leaderboards.ensure_indexes(db)
+        await leaderboards.record_workout(db, "ann", 20, 20, 1, MONDAY)
+        await leaderboards.record_workout(db, "ann", 15, 35, 2, MONDAY + timedelta(days=1))
+        await leaderboards.record_workout(db, "ann", 30, 65, 3, MONDAY + timedelta(days=7))
+
+        assert await leaderboards.top(db, "minutes", leaderboards.ALL_TIME, 10) == [
+            {"user_id": "ann", "score": 65, "rank": 1}
+        ]
+        assert (await leaderboards.top(db, "minutes", "2026-W07", 10))[0]["score"] == 35
+        assert (await leaderboards.top(db, "minutes", "2026-W08", 10))[0]["score"] == 30
+
+    with_db(scenario)
+
+
+def test_streak_board_keeps_the_best_streak(with_db):
+    async def scenario(db):
+        await leaderboards.ensure_indexes(db)
+        for day, streak in enumerate([1, 2, 3, 1]):
+            await leaderboards.record_workout(db, "ann", 10, 10 * (day + 1), streak, MONDAY + timedelta(days=day))
+        await leaderboards.record_workout(db, "bob", 10, 10, 2, MONDAY)
+
+        # Ann's streak lapsed back to 1; the board keeps her best of 3
+        assert await leaderboards.top(db, "streak", leaderboards.ALL_TIME, 10) == [
+            {"user_id": "ann", "score": 3, "rank": 1},
+            {"user_id": "bob", "score": 2, "rank": 2},
+        ]
+        assert (await leaderboards.rank_of(db, "streak", "2026-W07", "bob"))["rank"] == 2
+
+    with_db(scenario)
+
+
+def test_rank_matches_a_full_sort(with_db):
+    async def scenario(db):
+        await leaderboards.ensure_indexes(db)
+        rng = random.Random(5)
+        totals = {}
+        for n in range(60):
+            user_id, minutes = f"user-{n % 20}", rng.choice([5, 10, 15, 30, 45])
+            totals[user_id] = totals.get(user_id, 0) + minutes
+            await leaderboards.record_workout(db, user_id, minutes, totals[user_id], rng.randint(1, 9), MONDAY)
+
+        for board in leaderboards.BOARDS:
+            entries = await db.leaderboards.find({"board": board, "period": leaderboards.ALL_TIME}).to_list(None)
+            scores = [entry["score"] for entry in entries]
+            for entry in entries:
+                me = await leaderboards.rank_of(db, board, leaderboards.ALL_TIME, entry["user_id"])
+                assert me["rank"] == 1 + sum(score > entry["score"] for score in scores)
+
+    with_db(scenario)
+
+
+def test_removed_user_leaves_ranks(with_db):
+    async def scenario(db):
+        await leaderboards.ensure_indexes(db)
+        await leaderboards.record_workout(db, "ann", 60, 60, 1, MONDAY)
+        await leaderboards.record_workout(db, "bob", 30, 30, 1, MONDAY)
+        assert (await leaderboards.rank_of(db, "minutes", leaderboards.ALL_TIME, "bob"))["rank"] == 2
+
+        await leaderboards.remove_user(db, "ann")
+        assert await leaderboards.rank_of(db, "minutes", leaderboards.ALL_TIME, "ann") is None
+        assert (await leaderboards.rank_of(db, "minutes", leaderboards.ALL_TIME, "bob"))["rank"] == 1
+        # Weekly boards are kept
+        assert (await leaderboards.rank_of(db, "minutes", "2026-W07", "bob"))["rank"] == 2
+
+    with_db(scenario)
+
+
+def test_all_time_boards_are_backfilled_from_progress(with_db):
+    async def scenario(db):
+        await leaderboards.ensure_indexes(db)
+        await db.progress.insert_many([
+            {"user_id": "ann", "total_practice_minutes": 90, "streak_days": 2},
+            {"user_id": "bob", "total_practice_minutes": 40, "streak_days": 5},
+            {"user_id": "cy", "total_practice_minutes": 40, "streak_days": 1},
+            {"user_id": "new", "total_practice_minutes": 0, "streak_days": 0},
+        ])
+        # Dee practiced after the boards existed; her entries are kept
+        await leaderboards.record_workout(db, "dee", 10, 10, 1, MONDAY)
+
+        assert await leaderboards.backfill(db)
+        minutes = await leaderboards.top(db, "minutes", leaderboards.ALL_TIME, 10)
+        assert [(entry["user_id"], entry["rank"]) for entry in minutes] == [("ann", 1), ("bob", 2), ("cy", 2), ("dee", 4)]
+        assert (await leaderboards.rank_of(db, "streak", leaderboards.ALL_TIME, "bob"))["rank"] == 1
+        assert (await leaderboards.rank_of(db, "minutes", "2026-W07", "dee"))["rank"] == 1
+
+        # The next workout continues from the progress total
+        await leaderboards.record_workout(db, "cy", 15, 55, 2, MONDAY)
+        assert (await leaderboards.rank_of(db, "minutes", leaderboards.ALL_TIME, "cy"))["rank"] == 2
+
+        # Only runs once
+        assert not await leaderboards.backfill(db)
+        assert (await leaderboards.rank_of(db, "minutes", leaderboards.ALL_TIME, "dee"))["rank"] == 4
+
+    with_db(scenario)
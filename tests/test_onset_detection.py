@@ -0,0 +1,26 @@
+"""Onset detection on rendered click tracks, including a note at the very start of the recording."""
+import numpy as np
+import pytest
+
+import click_track
+import onset_detection
+
+SAMPLE_RATE = 22050
+
+
+def clicks(bpm: int = 120, lead_in: float = 0.0, noise: float = 0.0) -> np.ndarray:
+    samples = click_track.render(bpm, bars=4, sample_rate=SAMPLE_RATE) / 32768.0
+    samples = np.concatenate([np.zeros(int(lead_in * SAMPLE_RATE)), samples])
+    return samples + np.random.default_rng(0).normal(0, noise, len(samples))
+
+
+def test_every_click_is_found_including_the_first():
+    onsets = onset_detection.detect_onsets(clicks(), SAMPLE_RATE)
+    assert len(onsets) == 16
+    assert onsets == pytest.approx(np.arange(16) * 0.5, abs=0.02)
+
+
+def test_background_noise_at_the_start_is_not_an_onset():
+    onsets = onset_detection.detect_onsets(clicks(lead_in=0.5, noise=0.01), SAMPLE_RATE)
+    assert len(onsets) == 16
+    assert onsets[0] == pytest.approx(0.5, abs=0.02)
@@ -0,0 +1,251 @@
+"""Query-plan regression tests.
+
+Every filtered query shape the backend issues is run through explain()
+against a local mongod holding scaled-up synthetic data, with the indexes
+seeding creates (seeding.ensure_indexes). A test fails if the winning plan
+contains a COLLSCAN, sorts a sorted shape in memory, or examines more
+documents than the shape allows.
+
+    MONGO_TEST_URL=mongodb://localhost:27017 pytest tests/test_query_plans.py
+
+Skipped when no mongod is reachable. Uses (and drops) its own database.
+"""
+import asyncio
+import os
+import random
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import pytest
+
+pymongo = pytest.importorskip("pymongo")
+motor_asyncio = pytest.importorskip("motor.motor_asyncio")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import exercise_catalog  # noqa: E402
+import leaderboards  # noqa: E402
+import seeding  # noqa: E402
+
+MONGO_TEST_URL = os.environ.get("MONGO_TEST_URL", "mongodb://localhost:27017")
+DB_NAME = "guitar_gym_query_plans_test"
+
+# Synthetic data scale
+EXERCISE_COPIES = 50
+EXERCISES = 68 * EXERCISE_COPIES
+PLAYABLE_FRACTION = 0.9
+USERS = 20000
+TOMBSTONES = 5000
+
+# Queries over every playable exercise may examine those, with some slack for
+# the random draw, but not the unplayable ones a collection scan would add
+PLAYABLE_EXERCISES = int(EXERCISES * PLAYABLE_FRACTION * 1.03)
+UNPLAYABLE_EXERCISES = int(EXERCISES * (1 - PLAYABLE_FRACTION) * 1.25)
+
+
+class Shape(NamedTuple):
+    name: str
+    collection: str
+    filter: dict
+    max_examined: int
+    sort: Optional[list] = None
+    limit: int = 0
+    skip: int = 0
+    count: bool = False
+
+
+SAMPLE_USER = "user-4242"
+
+# Fenwick nodes rank_of reads for a score of 500: its prefix, plus the total
+RANK_NODES = sorted(set(leaderboards.prefix_nodes(500 + 1)) | set(leaderboards.prefix_nodes(leaderboards.MAX_SCORE)))
+
+SHAPES = [
+    # Exercise listing (/exercises) with and without filters, and its count
+    Shape("exercises_playable", "exercises", {"playable": True}, 50, limit=50),
+    Shape("exercises_by_domain", "exercises", {"playable": True, "domain": "Picking"}, 50, limit=50),
+    Shape("exercises_by_domain_and_tier", "exercises",
+          {"playable": True, "domain": "Picking", "difficulty_tier": "Beginner"}, 50, limit=50),
+    Shape("exercises_by_domain_page", "exercises", {"playable": True, "domain": "Picking"}, 150, limit=50, skip=100),
+    Shape("exercises_count_by_domain", "exercises", {"playable": True, "domain": "Picking"}, 0, count=True),
+    # Search filters by regex after narrowing to playable exercises
+    Shape("exercises_search", "exercises", {
+        "playable": True,
+        "$or": [{"title": {"$regex": "chord", "$options": "i"}}, {"tags": {"$regex": "chord", "$options": "i"}}],
+    }, PLAYABLE_EXERCISES, limit=50),
+    # Lookups by id (/exercises/{id}, /exercises/batch, /today)
+    Shape("exercise_by_id", "exercises", {"id": "timing-001"}, 1),
+    Shape("exercises_by_ids", "exercises", {"id": {"$in": ["timing-001", "timing-002", "picking-001"]}}, 3),
+    # Export streams playable exercises in ordinal order
+    Shape("exercises_export", "exercises", {"playable": True}, PLAYABLE_EXERCISES, sort=[("ordinal", 1)]),
+    # Content audit (/exercises/audit)
+    Shape("exercises_unplayable", "exercises", {"playable": {"$ne": True}}, UNPLAYABLE_EXERCISES),
+    # Ordinal map (load_catalog_ordinals, reserve_ordinals)
+    Shape("exercise_ordinals", "exercises", {"ordinal": {"$ne": None}}, EXERCISES),
+    # Curriculum
+    Shape("week_by_number", "weeks", {"number": 12}, 1),
+    Shape("weeks_by_phase", "weeks", {"phase_id": "phase-2"}, 52, sort=[("number", 1)]),
+    Shape("phase_by_id", "phases", {"id": "phase-2"}, 1),
+    Shape("day_variant_by_id", "day_variants", {"id": "week-12-day-3-45min"}, 1),
+    # Per-user documents
+    Shape("progress_by_user", "progress", {"user_id": SAMPLE_USER}, 1),
+    Shape("settings_by_user", "settings", {"user_id": SAMPLE_USER}, 1),
+    # Leaderboards
+    Shape("leaderboard_top", "leaderboards", {"board": "minutes", "period": "all"}, 10,
+          sort=[("score", -1)], limit=10),
+    Shape("leaderboard_entry", "leaderboards", {"board": "minutes", "period": "all", "user_id": SAMPLE_USER}, 1),
+    Shape("leaderboard_counts", "leaderboard_counts", {"board": "minutes", "period": "all", "node": {"$in": RANK_NODES}},
+          len(RANK_NODES)),
+    # Delta sync; the token is read from the counter document (sync_token)
+    Shape("sync_counter", "counters", {"_id": "sync_version"}, 1),
+    Shape("exercises_changed_since", "exercises", {"sync_version": {"$gt": 995}}, EXERCISES // 10),
+    Shape("weeks_changed_since", "weeks", {"sync_version": {"$gt": 995}}, 52),
+    Shape("day_variants_changed_since", "day_variants", {"sync_version": {"$gt": 995}}, 52 * 6 * 3 // 10),
+    Shape("progress_changed_since", "progress", {"user_id": SAMPLE_USER, "sync_version": {"$gt": 995}}, 1),
+    Shape("tombstones_since", "tombstones", {"sync_version": {"$gt": 995}, "user_id": {"$in": [None, SAMPLE_USER]}},
+          TOMBSTONES // 10),
+]
+
+
+def synthetic_exercises():
+    rng = random.Random(1)
+    docs = []
+    ordinal = 0
+    for copy_number in range(EXERCISE_COPIES):
+        for doc in exercise_catalog.as_dicts():
+            if copy_number:
+                doc["id"] = f"{doc['id']}-copy{copy_number}"
+            doc["ordinal"] = ordinal
+            doc["playable"] = rng.random() < PLAYABLE_FRACTION
+            doc["sync_version"] = rng.randint(1, 1000)
+            ordinal += 1
+            docs.append(doc)
+    return docs
+
+
+def synthetic_users():
+    rng = random.Random(2)
+    progress, settings, entries = [], [], []
+    for n in range(USERS):
+        user_id = f"user-{n}"
+        progress.append({"user_id": user_id, "current_week": rng.randint(1, 52), "current_day": rng.randint(1, 6),
+                         "total_practice_minutes": rng.randint(0, 5000), "sync_version": rng.randint(1, 1000)})
+        settings.append({"user_id": user_id, "preferred_duration": rng.choice([15, 30, 45, 60]),
+                         "sync_version": rng.randint(1, 1000)})
+        for board in ("minutes", "streak"):
+            for period in ("all", "2026-W07"):
+                entries.append({"board": board, "period": period, "user_id": user_id, "score": rng.randint(0, 1000)})
+    return progress, settings, entries
+
+
+def synthetic_counts(entries):
+    """Score counts per Fenwick node, as leaderboards.record_workout maintains them."""
+    counts = defaultdict(int)
+    for entry in entries:
+        for node in leaderboards.count_updates(entry["score"]):
+            counts[entry["board"], entry["period"], node] += 1
+    return [{"board": board, "period": period, "node": node, "count": count}
+            for (board, period, node), count in counts.items()]
+
+
+def synthetic_tombstones():
+    rng = random.Random(3)
+    return [
+        {"collection": "exercises", "key": f"gone-{n}", "user_id": None if n % 2 else f"user-{n}",
+         "sync_version": rng.randint(1, 1000)}
+        for n in range(TOMBSTONES)
+    ]
+
+
+async def create_indexes():
+    client = motor_asyncio.AsyncIOMotorClient(MONGO_TEST_URL)
+    try:
+        await seeding.ensure_indexes(client[DB_NAME])
+    finally:
+        client.close()
+
+
+@pytest.fixture(scope="module")
+def db():
+    client = pymongo.MongoClient(MONGO_TEST_URL, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except pymongo.errors.PyMongoError:
+        pytest.skip(f"No mongod reachable at {MONGO_TEST_URL}")
+
+    client.drop_database(DB_NAME)
+    database = client[DB_NAME]
+    asyncio.run(create_indexes())
+
+    source = seeding.seed_source()
+    rng = random.Random(4)
+    for name in ("phases", "weeks", "day_variants"):
+        for doc in source[name]:
+            doc["sync_version"] = rng.randint(1, 1000)
+        database[name].insert_many(source[name])
+    database.exercises.insert_many(synthetic_exercises())
+    progress, settings, entries = synthetic_users()
+    database.progress.insert_many(progress)
+    database.settings.insert_many(settings)
+    database.leaderboards.insert_many(entries)
+    database.leaderboard_counts.insert_many(synthetic_counts(entries))
+    database.tombstones.insert_many(synthetic_tombstones())
+    database.counters.insert_one({"_id": "sync_version", "value": 1000, "pending": {}})
+
+    yield database
+    client.drop_database(DB_NAME)
+    client.close()
+
+
+def plan_stages(plan) -> list:
+    """All stage names in an explain plan tree (classic and slot-based engine output)."""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(plan_stages(value))
+    return stages
+
+
+def explain(db, shape: Shape) -> dict:
+    if shape.count:
+        command = {"count": shape.collection, "query": shape.filter}
+    else:
+        command = {"find": shape.collection, "filter": shape.filter}
+        if shape.sort:
+            command["sort"] = dict(shape.sort)
+        if shape.limit:
+            command["limit"] = shape.limit
+        if shape.skip:
+            command["skip"] = shape.skip
+    return db.command("explain", command, verbosity="executionStats")
+
+
+@pytest.mark.parametrize("shape", SHAPES, ids=[shape.name for shape in SHAPES])
+def test_query_uses_index(db, shape):
+    result = explain(db, shape)
+    stages = plan_stages(result["queryPlanner"]["winningPlan"])
+    assert "COLLSCAN" not in stages, f"{shape.name} scans the whole {shape.collection} collection: {stages}"
+    if shape.sort:
+        assert "SORT" not in stages, f"{shape.name} sorts in memory instead of reading an index in order: {stages}"
+
+    examined = result["executionStats"]["totalDocsExamined"]
+    assert examined <= shape.max_examined, (
+        f"{shape.name} examined {examined} documents (allowed {shape.max_examined}): {stages}"
+    )
+
+
+def test_playable_domain_aggregation_uses_index(db):
+    """/exercises/domains and /exercises/difficulties group playable exercises."""
+    result = db.command(
+        "explain",
+        {"aggregate": "exercises", "pipeline": [{"$match": {"playable": True}}, {"$group": {"_id": "$domain", "count": {"$sum": 1}}}],
+         "cursor": {}},
+        verbosity="queryPlanner"
+    )
+    assert "COLLSCAN" not in plan_stages(result)
@@ -0,0 +1,203 @@
+"""Rate limiting: client addresses, token buckets, route rules and the expensive-request cap."""
+import asyncio
+
+import pytest
+
+import rate_limit
+from rate_limit import (
+    DEFAULT_TRUSTED_PROXIES, RateLimiter, RateLimitMiddleware, RouteLimit, client_address, parse_networks
+)
+
+TRUSTED = parse_networks(DEFAULT_TRUSTED_PROXIES)
+
+
+def scope(peer: str, forwarded: str = None, query: bytes = b"") -> dict:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return {"type": "http", "client": (peer, 51234), "headers": headers, "query_string": query}
+
+
+def test_direct_client_uses_peer_address():
+    assert client_address(scope("203.0.113.7"), TRUSTED) == "203.0.113.7"
+
+
+def test_untrusted_peer_cannot_spoof_forwarded_for():
+    assert client_address(scope("203.0.113.7", "198.51.100.1"), TRUSTED) == "203.0.113.7"
+
+
+def test_client_behind_ingress():
+    assert client_address(scope("10.1.2.3", "198.51.100.1"), TRUSTED) == "198.51.100.1"
+
+
+def test_spoofed_hops_left_of_the_client_are_ignored():
+    # The client sent "X-Forwarded-For: 1.2.3.4"; the ingress appended its peer
+    assert client_address(scope("10.1.2.3", "1.2.3.4, 198.51.100.1, 10.0.0.5"), TRUSTED) == "198.51.100.1"
+
+
+def test_user_id_parameter_does_not_change_the_client():
+    assert client_address(scope("10.1.2.3", "198.51.100.1", b"user_id=victim"), TRUSTED) == "198.51.100.1"
+
+
+def test_no_trusted_proxies_configured():
+    assert client_address(scope("10.1.2.3", "198.51.100.1"), parse_networks("")) == "10.1.2.3"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+def test_bucket_allows_a_burst_then_refills_at_the_rate(clock):
+    limiter = RateLimiter([], RouteLimit("default", "*", ".*", rate=2, burst=3))
+    rule = limiter.default
+    assert [limiter.check("a", rule) for _ in range(3)] == [0, 0, 0]
+    assert limiter.check("a", rule) == pytest.approx(0.5)
+    # Other clients have their own bucket
+    assert limiter.check("b", rule) == 0
+
+    clock.now += 0.5
+    assert limiter.check("a", rule) == 0
+    assert limiter.check("a", rule) > 0
+    # Refill never exceeds the burst
+    clock.now += 60
+    assert [limiter.check("a", rule) for _ in range(4)][-1] > 0
+
+
+def test_when_param_rule_only_applies_with_the_parameter():
+    search = RouteLimit("search", "GET", r"/api/exercises", rate=1, burst=5, when_param="search")
+    limiter = RateLimiter([search], RouteLimit("default", "*", ".*", rate=10, burst=50))
+    assert limiter.match("GET", "/api/exercises", {"search": "pentatonic"}) is search
+    assert limiter.match("GET", "/api/exercises", {"search": ""}) is limiter.default
+    assert limiter.match("GET", "/api/exercises", {}) is limiter.default
+    assert limiter.match("POST", "/api/exercises", {"search": "x"}) is limiter.default
+
+
+def call(app, path: str = "/api/slow", method: str = "GET", extensions: dict = None) -> tuple:
+    """One request through an ASGI app: the coroutine to await, and the list its sent messages land in."""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    request = {"type": "http", "method": method, "path": path, "query_string": b"",
+               "headers": [], "client": ("203.0.113.7", 51234)}
+    if method == "WEBSOCKET":
+        request = {**request, "type": "websocket", "extensions": extensions or {}}
+        del request["method"]
+    return app(request, receive, send), messages
+
+
+def status(messages: list) -> int:
+    return messages[0]["status"]
+
+
+def test_rejection_is_429_with_retry_after(clock):
+    async def ok(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    limiter = RateLimiter([], RouteLimit("default", "*", ".*", rate=0.25, burst=1))
+    app = RateLimitMiddleware(ok, limiter)
+
+    async def scenario():
+        results = []
+        for _ in range(2):
+            request, messages = call(app)
+            await request
+            results.append(messages)
+        return results
+
+    allowed, rejected = asyncio.run(scenario())
+    assert status(allowed) == 200
+    assert status(rejected) == 429
+    assert dict(rejected[0]["headers"])[b"retry-after"] == b"4"
+    assert limiter.stats()["rejected"] == 1
+
+
+def test_expensive_cap_holds_until_a_streamed_response_finishes():
+    async def scenario():
+        streaming = asyncio.Event()
+        finish = asyncio.Event()
+
+        async def stream(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"first", "more_body": True})
+            streaming.set()
+            await finish.wait()
+            await send({"type": "http.response.body", "body": b"last"})
+
+        audio = RouteLimit("audio", "GET", r"/api/slow", rate=100, burst=100, expensive=True)
+        limiter = RateLimiter([audio], RouteLimit("default", "*", ".*", rate=100, burst=100),
+                              max_expensive_in_flight=1)
+        app = RateLimitMiddleware(stream, limiter)
+
+        first, first_messages = call(app)
+        first = asyncio.create_task(first)
+        await streaming.wait()
+        assert limiter.expensive_in_flight == 1
+
+        second, second_messages = call(app)
+        await second
+        assert status(second_messages) == 429
+
+        finish.set()
+        await first
+        assert status(first_messages) == 200
+        assert limiter.expensive_in_flight == 0
+
+        third, third_messages = call(app)
+        await third
+        assert status(third_messages) == 200
+        assert limiter.expensive_in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_websocket_handshakes_draw_on_the_route_bucket(clock):
+    async def app(scope, receive, send):
+        if scope["type"] == "websocket":
+            await send({"type": "websocket.accept"})
+        else:
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+    live = r"/api/practice/[^/]+/live"
+    limiter = RateLimiter(
+        [RouteLimit("workout", "POST", r"/api/workout", rate=0.1, burst=2),
+         RouteLimit("workout", "WEBSOCKET", live, rate=0.1, burst=2)],
+        RouteLimit("default", "*", ".*", rate=100, burst=100)
+    )
+    app = RateLimitMiddleware(app, limiter)
+
+    async def scenario():
+        results = []
+        for path, method, extensions in [
+            ("/api/practice/ex-1/live", "WEBSOCKET", {}),
+            ("/api/workout", "POST", None),
+            ("/api/practice/ex-1/live", "WEBSOCKET", {"websocket.http.response": {}}),
+            ("/api/practice/ex-1/live", "WEBSOCKET", {}),
+        ]:
+            request, messages = call(app, path, method, extensions)
+            await request
+            results.append(messages)
+        return results
+
+    accepted, allowed, denied, closed = asyncio.run(scenario())
+    assert accepted == [{"type": "websocket.accept"}]
+    assert status(allowed) == 200
+    assert denied[0]["type"] == "websocket.http.response.start" and denied[0]["status"] == 429
+    assert dict(denied[0]["headers"])[b"retry-after"] == b"10"
+    # Without denial responses the handshake is closed as "try again later"
+    assert closed == [{"type": "websocket.close", "code": 1013}]
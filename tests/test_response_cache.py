@@ -0,0 +1,120 @@
+"""Single-flight loading, TTL expiry and LRU eviction of the response cache."""
+import asyncio
+
+import pytest
+
+import response_cache
+from response_cache import ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache.time, "monotonic", clock)
+    return clock
+
+
+def test_concurrent_misses_share_one_load():
+    cache = ResponseCache()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["value"] * 5
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 4
+    assert cache.get("k") == "value"
+
+
+def test_cancelled_leader_does_not_cancel_waiters():
+    cache = ResponseCache()
+    release = None
+
+    async def loader():
+        await release.wait()
+        return "value"
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        leader = asyncio.create_task(cache.get_or_load("k", loader))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_load("k", loader))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await waiter
+
+    assert asyncio.run(scenario()) == "value"
+    assert cache.get("k") == "value"
+
+
+def test_loader_errors_reach_every_waiter_and_are_not_cached():
+    cache = ResponseCache()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def scenario():
+        results = await asyncio.gather(*(cache.get_or_load("k", failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+
+        async def ok():
+            return 1
+        return await cache.get_or_load("k", ok)
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResponseCache(ttl_seconds=10)
+    cache.put("k", "value")
+    clock.now += 9.9
+    assert cache.get("k") == "value"
+    clock.now += 0.2
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_expired_entry_is_reloaded(clock):
+    cache = ResponseCache(ttl_seconds=10)
+    values = iter(["first", "second"])
+
+    async def loader():
+        return next(values)
+
+    async def scenario():
+        first = await cache.get_or_load("k", loader)
+        clock.now += 11
+        return first, await cache.get_or_load("k", loader)
+
+    assert asyncio.run(scenario()) == ("first", "second")
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
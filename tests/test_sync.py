@@ -0,0 +1,90 @@
+"""Delta sync tokens must never skip a document whose write was still in flight."""
+import asyncio
+from datetime import datetime, timedelta
+
+import sync
+
+USER = "user-1"
+
+
+def test_sync_during_slow_write_does_not_skip_it(with_db):
+    async def scenario(db):
+        await sync.ensure_sync_indexes(db)
+        allocated = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_writer():
+            async with sync.sync_write(db) as version:
+                allocated.set()
+                await release.wait()
+                await db.settings.update_one({"user_id": USER}, {"$set": {"sync_version": version}}, upsert=True)
+            return version
+
+        writer = asyncio.create_task(slow_writer())
+        await allocated.wait()
+        # A later write finishes while the slow one is still pending
+        async with sync.sync_write(db) as fast_version:
+            await db.weeks.insert_one({"number": 1, "sync_version": fast_version})
+
+        first = await sync.changes_since(db, 0, USER)
+        assert first["settings"] is None
+        assert [week["number"] for week in first["weeks"]] == [1]
+        assert first["token"] < fast_version
+
+        release.set()
+        slow_version = await writer
+        assert slow_version < fast_version
+
+        second = await sync.changes_since(db, first["token"], USER)
+        assert second["settings"]["sync_version"] == slow_version
+        assert second["token"] == fast_version
+
+        third = await sync.changes_since(db, second["token"], USER)
+        assert third["settings"] is None and third["weeks"] == []
+
+    with_db(scenario)
+
+
+def test_token_is_released_when_a_write_fails(with_db):
+    async def scenario(db):
+        try:
+            async with sync.sync_write(db):
+                raise RuntimeError("write failed")
+        except RuntimeError:
+            pass
+        assert await sync.sync_token(db) == await sync.current_sync_version(db) == 1
+
+    with_db(scenario)
+
+
+def test_abandoned_pending_write_stops_holding_the_token(with_db):
+    async def scenario(db):
+        await sync.next_sync_version(db)
+        started_at = datetime.utcnow() - timedelta(seconds=sync.PENDING_TTL_SECONDS + 1)
+        await db.counters.update_one({"_id": "sync_version"}, {"$set": {"pending.dead": {"version": 1, "started_at": started_at}}})
+        assert await sync.sync_token(db) == 1
+
+        # The next write clears it out of the counter document
+        async with sync.sync_write(db):
+            pass
+        assert (await db.counters.find_one({"_id": "sync_version"}))["pending"] == {}
+
+    with_db(scenario)
+
+
+def test_backfill_stamps_documents_without_a_version(with_db):
+    async def scenario(db):
+        await db.exercises.insert_many([{"id": "a"}, {"id": "b", "sync_version": 7}])
+        await db.progress.insert_one({"user_id": USER})
+        await sync.backfill_sync_versions(db)
+
+        changes = await sync.changes_since(db, 0, USER)
+        assert sorted(exercise["id"] for exercise in changes["exercises"]) == ["a", "b"]
+        assert changes["progress"]["sync_version"] > 0
+
+        # Only runs once
+        await db.exercises.insert_one({"id": "c"})
+        await sync.backfill_sync_versions(db)
+        assert "sync_version" not in await db.exercises.find_one({"id": "c"})
+
+    with_db(scenario)
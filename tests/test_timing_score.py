@@ -0,0 +1,59 @@
+"""Timing scores against the tempo grid, including half- and double-time playing."""
+import numpy as np
+import pytest
+
+import timing_score
+
+BPM = 120  # 0.5 s per quarter note
+
+
+def beats(count: int, spacing: float, start: float = 1.0) -> list:
+    return [start + i * spacing for i in range(count)]
+
+
+def test_on_the_grid_scores_full_marks():
+    metrics = timing_score.score_attempt(beats(8, 0.5), BPM)
+    assert metrics["timing_accuracy"] == metrics["tempo_accuracy"] == 100.0
+    assert metrics["tempo_ratio"] == 1.0
+    assert timing_score.evaluate(metrics, {"timing_accuracy": 90})["passed"]
+
+
+def test_half_tempo_fails():
+    metrics = timing_score.score_attempt(beats(8, 1.0), BPM)
+    assert metrics["tempo_ratio"] == 2.0
+    assert metrics["tempo_accuracy"] == 0.0
+    assert metrics["timing_accuracy"] < 60
+    # Evenness alone can't tell, but the attempt still doesn't pass
+    result = timing_score.evaluate(metrics, {"consistency": 80, "evenness": 80})
+    assert not result["passed"] and not result["on_tempo"]
+
+
+def test_double_tempo_fails():
+    metrics = timing_score.score_attempt(beats(16, 0.25), BPM)
+    assert metrics["tempo_ratio"] == 0.5
+    assert metrics["tempo_accuracy"] == 0.0
+    assert metrics["timing_accuracy"] < 60
+    assert not timing_score.evaluate(metrics, {"consistency": 0})["passed"]
+
+
+def test_skipped_note_counts_as_a_miss_without_shifting_the_rest():
+    onsets = [1.0, 1.5, 2.0, 3.0, 3.5, 4.0]  # the note at 2.5 s was skipped
+    metrics = timing_score.score_attempt(onsets, BPM)
+    assert metrics["timing_accuracy"] == pytest.approx(100 * 6 / 7, abs=0.01)
+    assert metrics["tempo_ratio"] == 1.0
+
+
+def test_batch_matches_single_attempts():
+    attempts = [beats(8, 0.5), beats(8, 1.0), beats(5, 0.5)]
+    batch = timing_score.score_batch(timing_score.pad(attempts), BPM)
+    for row, attempt in enumerate(attempts):
+        single = timing_score.score_attempt(attempt, BPM)
+        assert batch["timing_accuracy"][row] == pytest.approx(single["timing_accuracy"], abs=0.01)
+        assert batch["tempo_ratio"][row] == pytest.approx(single["tempo_ratio"])
+
+
+def test_single_note_is_not_scored():
+    metrics = timing_score.score_attempt([1.0], BPM)
+    assert metrics["timing_accuracy"] is None
+    assert not timing_score.evaluate(metrics, {"timing_accuracy": 0})["passed"]
+    assert np.isnan(timing_score.score_batch(timing_score.pad([[1.0]]), BPM)["tempo_ratio"][0])